@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+"""Offline benchmark for the Open-Meteo MCP server.
+
+Starts benchmarks/fake_open_meteo.py as the upstream, then for every
+(transport, tool) pair spawns a fresh server, drives it with concurrent MCP
+clients and reports throughput, latency percentiles, server CPU time and peak
+RSS. Over stdio the clients share the single session the transport allows;
+over streamable-http each client has its own session.
+
+    python benchmarks/bench_server.py --requests 200 --concurrency 8 --latency-ms 20
+    python benchmarks/bench_server.py --json after.json --compare before.json
+    python benchmarks/bench_server.py --transports streamable-http --workers 4 --concurrency 32
+
+With --compare the run exits non-zero when throughput drops or p50/p99
+latency grows by more than --tolerance against the baseline file.
+
+With --replay the synthetic scenarios are replaced by traffic captured from a
+server running with OPEN_METEO_CAPTURE_FILE: the fake upstream serves the
+recorded responses and the recorded tool calls are re-issued at their
+original arrival times (scaled by --time-scale) against one server per
+transport, so cache, batching and pooling strategies can be compared on the
+same production mix.
+
+    python benchmarks/bench_server.py --replay capture.jsonl.gz --time-scale 0.25
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from fake_open_meteo import load_capture, upstream_env
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVER_SCRIPT = ROOT / "open_meteo_server.py"
+FAKE_UPSTREAM_SCRIPT = Path(__file__).resolve().parent / "fake_open_meteo.py"
+
+
+def _location(i: int) -> tuple[float, float]:
+    # Spread calls over distinct coordinates so they are distinct upstream queries
+    return round(-60 + (i * 7.3) % 120, 2), round(-180 + (i * 13.7) % 360, 2)
+
+
+SCENARIOS: dict[str, Callable[[int], dict[str, Any]]] = {
+    "get_forecast": lambda i: {
+        "latitude": _location(i)[0],
+        "longitude": _location(i)[1],
+        "hourly": "temperature_2m,precipitation,wind_speed_10m",
+    },
+    "get_historical_forecast": lambda i: {
+        "latitude": _location(i)[0],
+        "longitude": _location(i)[1],
+        "start_date": "2024-01-01",
+        "end_date": "2024-01-31",
+        "hourly": "temperature_2m,precipitation",
+    },
+    "get_previous_model_runs": lambda i: {
+        "latitude": _location(i)[0],
+        "longitude": _location(i)[1],
+        "start_date": "2024-06-01",
+        "end_date": "2024-06-07",
+        "hourly": "temperature_2m,precipitation",
+    },
+    "get_historical_weather": lambda i: {
+        "latitude": _location(i)[0],
+        "longitude": _location(i)[1],
+        "start_date": "2020-01-01",
+        "end_date": "2020-12-31",
+        "hourly": "temperature_2m,precipitation",
+    },
+    "get_ensemble_forecast": lambda i: {
+        "latitude": _location(i)[0],
+        "longitude": _location(i)[1],
+        "forecast_days": 14,
+        "thresholds": "precipitation>1,wind_gusts_10m>=60",
+    },
+}
+
+
+@dataclass
+class RunResult:
+    transport: str
+    tool: str
+    calls: int
+    errors: int
+    wall_s: float
+    cpu_s: float
+    peak_rss_mb: float
+    latencies_ms: list[float] = field(default_factory=list, repr=False)
+
+    def summary(self) -> dict[str, Any]:
+        ordered = sorted(self.latencies_ms)
+        return {
+            "transport": self.transport,
+            "tool": self.tool,
+            "calls": self.calls,
+            "errors": self.errors,
+            "throughput_rps": round(self.calls / self.wall_s, 2) if self.wall_s else 0.0,
+            "p50_ms": round(percentile(ordered, 50), 2),
+            "p90_ms": round(percentile(ordered, 90), 2),
+            "p99_ms": round(percentile(ordered, 99), 2),
+            "cpu_s": round(self.cpu_s, 3),
+            "cpu_ms_per_call": round(1000 * self.cpu_s / self.calls, 3) if self.calls else 0.0,
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+        }
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not ordered:
+        return math.nan
+    rank = (len(ordered) - 1) * pct / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid: int) -> list[int]:
+    children = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            children.append(int(entry.name))
+    return children
+
+
+def process_tree(pid: int) -> list[int]:
+    """The process and all of its descendants (Linux only, empty elsewhere)."""
+    if not Path("/proc").is_dir():
+        return []
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(_children(current))
+    return tree
+
+
+def process_stats(pids: list[int]) -> tuple[float, float]:
+    """Total CPU seconds and summed peak RSS (MiB) of the given processes."""
+    if not pids:
+        return math.nan, math.nan
+    ticks = os.sysconf("SC_CLK_TCK")
+    cpu, peak_kb = 0.0, 0
+    for pid in pids:
+        try:
+            fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / ticks
+            for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    peak_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return cpu, peak_kb / 1024
+
+
+def find_server_pid() -> int | None:
+    """Locate the stdio server spawned by stdio_client among our children."""
+    for pid in _children(os.getpid()) if Path("/proc").is_dir() else []:
+        try:
+            if SERVER_SCRIPT.name in Path(f"/proc/{pid}/cmdline").read_text():
+                return pid
+        except OSError:
+            continue
+    return None
+
+
+async def wait_for_health(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+            await asyncio.sleep(0.1)
+
+
+@contextlib.asynccontextmanager
+async def running_process(cmd: list[str], env: dict[str, str], health_url: str) -> AsyncIterator[subprocess.Popen]:
+    process = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        await wait_for_health(health_url)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def call_tool(session: ClientSession, tool: str, arguments: dict[str, Any]) -> bool:
+    try:
+        result = await session.call_tool(tool, arguments)
+    except Exception:
+        return False
+    return not result.isError
+
+
+async def drive(sessions: list[ClientSession], tool: str, requests: int, concurrency: int) -> tuple[list[float], int, float]:
+    """Issue ``requests`` calls from ``concurrency`` workers; returns latencies, errors and wall time."""
+    make_args = SCENARIOS[tool]
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker(session: ClientSession) -> None:
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            ok = await call_tool(session, tool, make_args(i))
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(sessions[n % len(sessions)]) for n in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def measure(sessions: list[ClientSession], pids: Callable[[], list[int]], transport: str, tool: str,
+                  args: argparse.Namespace) -> RunResult:
+    for i in range(args.warmup):
+        await call_tool(sessions[0], tool, SCENARIOS[tool](args.requests + i))
+    cpu_before, _ = process_stats(pids())
+    latencies, errors, wall = await drive(sessions, tool, args.requests, args.concurrency)
+    cpu_after, peak_rss = process_stats(pids())
+    return RunResult(transport, tool, len(latencies), errors, wall, cpu_after - cpu_before, peak_rss, latencies)
+
+
+@contextlib.asynccontextmanager
+async def stdio_sessions(env: dict[str, str], count: int, workers: int = 1) -> AsyncIterator[tuple[list[ClientSession], Callable[[], list[int]]]]:
+    params = StdioServerParameters(command=sys.executable, args=[str(SERVER_SCRIPT)], env=env)
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read, write), ClientSession(read, write) as session:
+            await session.initialize()
+            pid = find_server_pid()
+            yield [session], lambda: process_tree(pid) if pid else []
+
+
+@contextlib.asynccontextmanager
+async def http_sessions(env: dict[str, str], count: int, workers: int = 1) -> AsyncIterator[tuple[list[ClientSession], Callable[[], list[int]]]]:
+    port = free_port()
+    cmd = [sys.executable, str(SERVER_SCRIPT), "--transport", "streamable-http", "--port", str(port),
+           "--workers", str(workers)]
+    # The sessions all connect from 127.0.0.1, so let admission control tell them apart by X-Client-Id
+    env = {**env, "OPEN_METEO_TRUST_CLIENT_ID": "1"}
+    async with running_process(cmd, env, f"http://127.0.0.1:{port}/health") as server:
+        async with contextlib.AsyncExitStack() as stack:
+            sessions = []
+            for n in range(count):
+                read, write, _ = await stack.enter_async_context(
+                    streamablehttp_client(f"http://127.0.0.1:{port}/mcp", headers={"X-Client-Id": f"bench-{n}"}))
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                sessions.append(session)
+            yield sessions, lambda: process_tree(server.pid)
+
+
+SESSIONS = {"stdio": stdio_sessions, "streamable-http": http_sessions}
+
+
+async def bench_tool(transport: str, tool: str, env: dict[str, str], args: argparse.Namespace) -> list[RunResult]:
+    async with SESSIONS[transport](env, args.concurrency, args.workers) as (sessions, pids):
+        return [await measure(sessions, pids, transport, tool, args)]
+
+
+async def bench_replay(transport: str, calls: list[dict[str, Any]], env: dict[str, str],
+                       args: argparse.Namespace) -> list[RunResult]:
+    """Re-issue captured tool calls open-loop at their recorded offsets."""
+    async with SESSIONS[transport](env, args.concurrency, args.workers) as (sessions, pids):
+        by_tool: dict[str, RunResult] = {}
+        origin = min(call["t"] for call in calls)
+        cpu_before, _ = process_stats(pids())
+        start = time.perf_counter()
+
+        async def issue(i: int, call: dict[str, Any]) -> None:
+            delay = (call["t"] - origin) * args.time_scale - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            began = time.perf_counter()
+            ok = await call_tool(sessions[i % len(sessions)], call["tool"], call["arguments"])
+            result = by_tool.setdefault(call["tool"], RunResult(transport, call["tool"], 0, 0, 0.0, math.nan, math.nan))
+            result.latencies_ms.append((time.perf_counter() - began) * 1000)
+            result.calls += 1
+            result.errors += not ok
+
+        await asyncio.gather(*(issue(i, call) for i, call in enumerate(calls)))
+        wall = time.perf_counter() - start
+        cpu_after, peak_rss = process_stats(pids())
+
+    results = list(by_tool.values())
+    for result in results:
+        result.wall_s = wall
+    total = RunResult(transport, "(all)", sum(r.calls for r in results), sum(r.errors for r in results),
+                      wall, cpu_after - cpu_before, peak_rss,
+                      [latency for r in results for latency in r.latencies_ms])
+    return results + [total]
+
+
+def compare(results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float) -> list[str]:
+    """Describe every metric that regressed by more than ``tolerance`` against the baseline."""
+    previous = {(row["transport"], row["tool"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        old = previous.get((row["transport"], row["tool"]))
+        if old is None:
+            continue
+        name = f"{row['transport']}/{row['tool']}"
+        if row["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {old['throughput_rps']} -> {row['throughput_rps']} rps")
+        for key in ("p50_ms", "p99_ms"):
+            if row[key] > old[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {old[key]} -> {row[key]}")
+    return regressions
+
+
+def print_table(rows: list[dict[str, Any]]) -> None:
+    columns = ["transport", "tool", "calls", "errors", "throughput_rps", "p50_ms", "p90_ms", "p99_ms",
+               "cpu_ms_per_call", "peak_rss_mb"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transports", default="stdio,streamable-http")
+    parser.add_argument("--tools", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Measured calls per tool and transport")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent MCP clients")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Server worker processes for streamable-http (stdio always runs one)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hours", type=int, default=None, help="Force hourly timesteps per upstream response")
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the server under test (repeatable)")
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file")
+    parser.add_argument("--compare", help="Baseline results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--replay", help="Replay the tool calls and upstream responses of this capture file")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="With --replay, multiplier for recorded arrival times and upstream latencies")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    upstream_port = free_port()
+    upstream_cmd = [
+        sys.executable, str(FAKE_UPSTREAM_SCRIPT), "--port", str(upstream_port),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate),
+    ]
+    if args.hours is not None:
+        upstream_cmd += ["--hours", str(args.hours)]
+    if args.replay:
+        upstream_cmd += ["--replay", args.replay, "--time-scale", str(args.time_scale)]
+        calls = [record for record in load_capture(args.replay) if record["type"] == "tool"]
+    env = {**os.environ, **upstream_env(f"http://127.0.0.1:{upstream_port}")}
+    env.update(item.split("=", 1) for item in args.server_env)
+
+    rows = []
+    async with running_process(upstream_cmd, dict(os.environ), f"http://127.0.0.1:{upstream_port}/health"):
+        for transport in args.transports.split(","):
+            if args.replay:
+                results = await bench_replay(transport, calls, env, args)
+            else:
+                results = [result for tool in args.tools.split(",")
+                           for result in await bench_tool(transport, tool, env, args)]
+            for result in results:
+                rows.append(result.summary())
+                print(f"{transport:>15} {result.tool:<24} {rows[-1]['throughput_rps']:>9} rps  "
+                      f"p50 {rows[-1]['p50_ms']} ms", file=sys.stderr)
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    rows = asyncio.run(run(args))
+    print_table(rows)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(rows, indent=2))
+    if args.compare:
+        regressions = compare(rows, json.loads(Path(args.compare).read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
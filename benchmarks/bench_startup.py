@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""Cold-start benchmark for the stdio entry points.
+
+Spawns a fresh process per run, the way Claude Desktop does for every session,
+and times how long it takes to answer ``initialize``, ``tools/list`` and the
+first request that needs the full server (``prompts/get``). The fast launcher
+(open_meteo_stdio.py) is measured with a warm manifest next to the plain
+server, with bare interpreter startup as the floor.
+
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --budget-ms 100
+
+The run exits non-zero when the launcher's median time-to-tools/list exceeds
+the interpreter floor by more than --budget-ms (default 100). Measuring above
+the floor keeps the budget about this code rather than about how fast the
+machine starts Python; importing the full server costs several times the budget.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET_MS = 100.0
+ENTRY_POINTS = {
+    "launcher": ROOT / "open_meteo_stdio.py",
+    "server": ROOT / "open_meteo_server.py",
+}
+
+REQUESTS = [
+    ("initialize", {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+        "protocolVersion": "2025-03-26", "capabilities": {},
+        "clientInfo": {"name": "bench-startup", "version": "0"},
+    }}),
+    (None, {"jsonrpc": "2.0", "method": "notifications/initialized"}),
+    ("tools/list", {"jsonrpc": "2.0", "id": 2, "method": "tools/list"}),
+    ("prompts/get", {"jsonrpc": "2.0", "id": 3, "method": "prompts/get",
+                     "params": {"name": "current_weather", "arguments": {"location": "Berlin"}}}),
+]
+
+
+def time_session(script: Path, env: dict[str, str]) -> dict[str, float]:
+    """Milliseconds from spawn until each request's response arrives."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, str(script)], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, env=env, cwd=ROOT)
+    timings = {}
+    try:
+        for label, message in REQUESTS:
+            proc.stdin.write(json.dumps(message).encode() + b"\n")
+            proc.stdin.flush()
+            if label is None:
+                continue
+            response = json.loads(proc.stdout.readline())
+            if "result" not in response:
+                raise RuntimeError(f"{script.name} {label}: {response}")
+            timings[label] = (time.perf_counter() - start) * 1000
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=10)
+    return timings
+
+
+def time_interpreter(env: dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def run(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    env = {**os.environ, "OPEN_METEO_MANIFEST_DIR": args.manifest_dir}
+    # The first launcher run writes the manifest; it is not measured
+    time_session(ENTRY_POINTS["launcher"], env)
+    results: dict[str, dict[str, float]] = {
+        "python -c pass": {"interpreter": statistics.median(time_interpreter(env) for _ in range(args.runs))},
+    }
+    for name, script in ENTRY_POINTS.items():
+        runs = [time_session(script, env) for _ in range(args.runs)]
+        results[name] = {label: statistics.median(run[label] for run in runs) for label in runs[0]}
+    return results
+
+
+def print_table(results: dict[str, dict[str, float]]) -> None:
+    labels = [label for label, _ in REQUESTS if label is not None]
+    print(f"{'entry point':<16}" + "".join(f"{label:>14}" for label in labels))
+    for name, timings in results.items():
+        cells = "".join(f"{timings[label]:>12.1f}ms" if label in timings else f"{'':>14}" for label in labels)
+        print(f"{name:<16}{cells}" + (f"  ({timings['interpreter']:.1f}ms)" if "interpreter" in timings else ""))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Process launches per entry point")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Fail when the launcher's median time-to-tools/list exceeds the "
+                             "'python -c pass' floor by more than this; 0 disables the check")
+    parser.add_argument("--manifest-dir", default=os.path.join(tempfile.gettempdir(), "open-meteo-bench-manifest"))
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    results = run(args)
+    print_table(results)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+    if args.budget_ms:
+        floor = results["python -c pass"]["interpreter"]
+        overhead = results["launcher"]["tools/list"] - floor
+        if overhead > args.budget_ms:
+            print(f"OVER BUDGET launcher tools/list {overhead:.1f}ms above the {floor:.1f}ms floor "
+                  f"> {args.budget_ms:.1f}ms", file=sys.stderr)
+            return 1
+        print(f"launcher tools/list {overhead:.1f}ms above the floor, within {args.budget_ms:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+"""Local stand-in for the Open-Meteo APIs used by the benchmarks.
+
+Each upstream gets its own path prefix so one process can impersonate all of
+them; point the server at it with the OPEN_METEO_*_API_BASE variables printed
+by ``upstream_env``. Responses have the real Open-Meteo shape (``hourly`` /
+``daily`` column arrays plus units) with synthetic values, and latency,
+payload size and error rate are configurable.
+
+    python benchmarks/fake_open_meteo.py --port 8081 --latency-ms 40 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import math
+import random
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+
+# Path prefix per upstream, keyed by the server's base URL variable
+UPSTREAM_PATHS = {
+    "OPEN_METEO_API_BASE": "/forecast/v1/forecast",
+    "OPEN_METEO_HISTORICAL_API_BASE": "/historical-forecast/v1/forecast",
+    "OPEN_METEO_PREVIOUS_RUNS_API_BASE": "/previous-runs/v1/forecast",
+    "OPEN_METEO_ARCHIVE_API_BASE": "/archive/v1/archive",
+    "OPEN_METEO_ENSEMBLE_API_BASE": "/ensemble/v1/ensemble",
+}
+
+# Members per ensemble model, control run included
+ENSEMBLE_MEMBERS = {"ecmwf_ifs025": 51, "gfs025": 31, "icon_seamless": 40, "gem_global": 21}
+
+UNITS = {
+    "temperature": "°C",
+    "precipitation": "mm",
+    "rain": "mm",
+    "snowfall": "cm",
+    "wind": "km/h",
+    "humidity": "%",
+    "cloud": "%",
+    "radiation": "W/m²",
+    "pressure": "hPa",
+    "soil_moisture": "m³/m³",
+}
+
+
+def load_capture(path: str) -> list[dict]:
+    """Read the records of a capture file written by open_meteo_server.TrafficRecorder.
+
+    Offsets of later capture sessions appended to the same file are shifted by
+    their start time, so ``t`` is relative to the first session throughout. A
+    member cut short by a killed server ends the read instead of failing it.
+    """
+    records = []
+    first_started = offset = None
+    with gzip.open(path, "rt", encoding="utf-8") as capture:
+        try:
+            for line in capture:
+                record = json.loads(line)
+                if record["type"] == "header":
+                    first_started = first_started or record["started"]
+                    offset = record["started"] - first_started
+                else:
+                    record["t"] += offset
+                    records.append(record)
+        except (EOFError, json.JSONDecodeError):
+            pass
+    return records
+
+
+class ReplayStore:
+    """Recorded upstream responses keyed by upstream and query string.
+
+    Repeated identical queries are answered with their recordings in capture
+    order, wrapping around once exhausted.
+    """
+
+    def __init__(self, records: list[dict]) -> None:
+        self.responses: dict[tuple, deque] = {}
+        self.hits = 0
+        self.misses = 0
+        for record in records:
+            if record["type"] == "upstream":
+                key = (record["api"], tuple(sorted(record["params"].items())))
+                self.responses.setdefault(key, deque()).append(record)
+
+    def next(self, api: str, query: tuple[tuple[str, str], ...]) -> dict | None:
+        recordings = self.responses.get((api, query))
+        if not recordings:
+            self.misses += 1
+            return None
+        self.hits += 1
+        recording = recordings[0]
+        recordings.rotate(-1)
+        return recording
+
+
+@dataclass
+class FakeUpstreamConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    # Override the number of timesteps per response to force a payload size
+    hours: int | None = None
+    seed: int = 0
+    replay: ReplayStore | None = None
+    # Multiplier applied to recorded latencies when replaying
+    time_scale: float = 1.0
+
+
+def upstream_env(base_url: str) -> dict[str, str]:
+    """Environment that points open_meteo_server at a fake upstream."""
+    return {name: base_url.rstrip("/") + path for name, path in UPSTREAM_PATHS.items()}
+
+
+def _unit(variable: str) -> str:
+    for prefix, unit in UNITS.items():
+        if variable.startswith(prefix) or f"_{prefix}" in variable:
+            return unit
+    return ""
+
+
+def _time_axis(params: dict[str, str], step: timedelta, hours: int | None) -> list[str]:
+    fmt = "%Y-%m-%dT%H:%M" if step < timedelta(days=1) else "%Y-%m-%d"
+    if "start_date" in params:
+        start = datetime.combine(date.fromisoformat(params["start_date"]), datetime.min.time())
+        end = datetime.combine(date.fromisoformat(params["end_date"]), datetime.min.time()) + timedelta(days=1)
+    else:
+        start = datetime(2024, 1, 1)
+        end = start + timedelta(days=int(params.get("forecast_days", 7)))
+    count = int((end - start) / step)
+    if hours is not None and step < timedelta(days=1):
+        count = hours
+    return [(start + i * step).strftime(fmt) for i in range(count)]
+
+
+def _series(variable: str, length: int, seed: int) -> list[float | None]:
+    rng = random.Random(f"{seed}:{variable}")
+    base, amplitude = rng.uniform(-5, 25), rng.uniform(1, 10)
+    phase = rng.uniform(0, 2 * math.pi)
+    return [round(base + amplitude * math.sin(i / 24 * 2 * math.pi + phase), 1) for i in range(length)]
+
+
+def _columns(variables: str, axis: list[str], seed: int, members: int = 1) -> tuple[dict, dict]:
+    names = [v.strip() for v in variables.split(",") if v.strip()]
+    # Ensemble responses add name_member01.. columns after the control run's
+    columns = [(name, f"{name}_member{m:02d}" if m else name) for name in names for m in range(members)]
+    data = {"time": axis, **{column: _series(column, len(axis), seed) for _, column in columns}}
+    units = {"time": "iso8601", **{column: _unit(name) for name, column in columns}}
+    return data, units
+
+
+@lru_cache(maxsize=1024)
+def render_payload(query: tuple[tuple[str, str], ...], hours: int | None, seed: int, members: int = 1) -> bytes:
+    """Build and serialize a response once per distinct query."""
+    params = dict(query)
+    body: dict = {
+        "latitude": float(params.get("latitude", 0)),
+        "longitude": float(params.get("longitude", 0)),
+        "generationtime_ms": 0.1,
+        "utc_offset_seconds": 0,
+        "timezone": params.get("timezone", "GMT"),
+        "timezone_abbreviation": params.get("timezone", "GMT"),
+        "elevation": 38.0,
+    }
+    if params.get("hourly"):
+        body["hourly"], body["hourly_units"] = _columns(
+            params["hourly"], _time_axis(params, timedelta(hours=1), hours), seed, members
+        )
+    if params.get("daily"):
+        body["daily"], body["daily_units"] = _columns(
+            params["daily"], _time_axis(params, timedelta(days=1), hours), seed
+        )
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
+def create_app(config: FakeUpstreamConfig) -> Starlette:
+    rng = random.Random(config.seed)
+    api_names = {path: name for name, path in UPSTREAM_PATHS.items()}
+
+    async def handle(request: Request) -> Response:
+        query = tuple(sorted(request.query_params.items()))
+        if config.replay is not None:
+            recording = config.replay.next(api_names[request.url.path], query)
+            if recording is not None:
+                await asyncio.sleep(recording["duration_ms"] * config.time_scale / 1000)
+                return Response(recording["body"], status_code=recording["status"], media_type="application/json")
+        headers = {"X-Replay": "miss"} if config.replay is not None else None
+        delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if config.error_rate and rng.random() < config.error_rate:
+            return PlainTextResponse('{"error":true,"reason":"injected"}', status_code=config.error_status, headers=headers)
+        try:
+            members = 1
+            if api_names[request.url.path] == "OPEN_METEO_ENSEMBLE_API_BASE":
+                members = ENSEMBLE_MEMBERS.get(request.query_params.get("models", ""), 51)
+            payload = render_payload(query, config.hours, config.seed, members)
+        except (KeyError, ValueError) as exc:
+            return PlainTextResponse(f'{{"error":true,"reason":"{exc}"}}', status_code=400, headers=headers)
+        return Response(payload, media_type="application/json", headers=headers)
+
+    async def health(request: Request) -> Response:
+        return PlainTextResponse("OK")
+
+    routes = [Route(path, handle, methods=["GET"]) for path in UPSTREAM_PATHS.values()]
+    routes.append(Route("/health", health, methods=["GET"]))
+    return Starlette(routes=routes)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter around the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--hours", type=int, default=None, help="Force this many hourly timesteps per response")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", help="Serve the upstream exchanges recorded in this capture file")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Multiplier for recorded latencies (0.5 = twice as fast, 0 = no delay)")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    import uvicorn
+
+    args = parse_args(argv)
+    config = FakeUpstreamConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        hours=args.hours,
+        seed=args.seed,
+        replay=ReplayStore(load_capture(args.replay)) if args.replay else None,
+        time_scale=args.time_scale,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
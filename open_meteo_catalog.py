@@ -0,0 +1,260 @@
+"""Local catalog of what each Open-Meteo API serves through this server's tools.
+
+Lists the hourly and daily variables, the models and the date coverage of every
+endpoint the server calls, so requests can be checked before they leave the
+process: a typo in ``hourly`` or ``models``, a variable the endpoint does not
+have or a date outside its range is rejected with suggestions instead of after
+an upstream round trip. The tables are plain frozensets built at import, so a
+valid request costs a handful of set lookups.
+
+Coverage is per endpoint, not per model: a model may still lack a variable or
+the early years of a range, which only the upstream API can tell.
+
+    import open_meteo_catalog as catalog
+
+    catalog.validate("forecast", hourly="temperature_2m,precipitaton")
+    # ValueError: Unknown hourly variable 'precipitaton' for get_forecast (did you mean 'precipitation' ...?)
+"""
+
+import difflib
+import functools
+import re
+from collections.abc import Iterable
+from datetime import date, timedelta
+from typing import Any
+
+MAX_PREVIOUS_DAYS = 7
+PRESSURE_LEVELS = (1000, 975, 950, 925, 900, 850, 800, 700, 600, 500, 400, 300, 250, 200, 150, 100, 70, 50, 30)
+PRESSURE_LEVEL_VARIABLES = (
+    "temperature", "relative_humidity", "dew_point", "cloud_cover", "wind_speed", "wind_direction",
+    "geopotential_height", "vertical_velocity",
+)
+
+RADIATION = (
+    "shortwave_radiation", "direct_radiation", "diffuse_radiation", "direct_normal_irradiance",
+    "global_tilted_irradiance", "terrestrial_radiation",
+)
+RADIATION_HOURLY = RADIATION + tuple(f"{name}_instant" for name in RADIATION)
+
+FORECAST_HOURLY = frozenset((
+    "temperature_2m", "relative_humidity_2m", "dew_point_2m", "apparent_temperature", "wet_bulb_temperature_2m",
+    "precipitation_probability", "precipitation", "rain", "showers", "snowfall", "snowfall_height", "snow_depth",
+    "freezing_level_height", "weather_code", "pressure_msl", "surface_pressure", "cloud_cover", "cloud_cover_low",
+    "cloud_cover_mid", "cloud_cover_high", "visibility", "evapotranspiration", "et0_fao_evapotranspiration",
+    "vapour_pressure_deficit", "wind_speed_10m", "wind_speed_80m", "wind_speed_100m", "wind_speed_120m",
+    "wind_speed_180m", "wind_direction_10m", "wind_direction_80m", "wind_direction_100m", "wind_direction_120m",
+    "wind_direction_180m", "wind_gusts_10m", "temperature_80m", "temperature_120m", "temperature_180m",
+    "soil_temperature_0cm", "soil_temperature_6cm", "soil_temperature_18cm", "soil_temperature_54cm",
+    "soil_moisture_0_to_1cm", "soil_moisture_1_to_3cm", "soil_moisture_3_to_9cm", "soil_moisture_9_to_27cm",
+    "soil_moisture_27_to_81cm", "uv_index", "uv_index_clear_sky", "is_day", "sunshine_duration", "cape",
+    "lifted_index", "convective_inhibition", "lightning_potential", "boundary_layer_height",
+    "total_column_integrated_water_vapour", *RADIATION_HOURLY,
+))
+
+ENSEMBLE_HOURLY = frozenset((
+    "temperature_2m", "relative_humidity_2m", "dew_point_2m", "apparent_temperature", "precipitation", "rain",
+    "showers", "snowfall", "snowfall_height", "snow_depth", "freezing_level_height", "weather_code",
+    "pressure_msl", "surface_pressure", "cloud_cover", "visibility", "et0_fao_evapotranspiration",
+    "vapour_pressure_deficit", "wind_speed_10m", "wind_speed_80m", "wind_speed_100m", "wind_speed_120m",
+    "wind_direction_10m", "wind_direction_80m", "wind_direction_100m", "wind_direction_120m", "wind_gusts_10m",
+    "temperature_80m", "temperature_120m", "surface_temperature", "soil_temperature_0_to_10cm",
+    "soil_temperature_10_to_40cm", "soil_temperature_40_to_100cm", "soil_temperature_100_to_200cm",
+    "soil_moisture_0_to_10cm", "soil_moisture_10_to_40cm", "soil_moisture_40_to_100cm",
+    "soil_moisture_100_to_200cm", "uv_index", "uv_index_clear_sky", "is_day", "sunshine_duration", "cape",
+    *RADIATION_HOURLY,
+))
+
+ARCHIVE_HOURLY = frozenset((
+    "temperature_2m", "relative_humidity_2m", "dew_point_2m", "apparent_temperature", "wet_bulb_temperature_2m",
+    "precipitation", "rain", "snowfall", "snow_depth", "snow_depth_water_equivalent", "weather_code",
+    "pressure_msl", "surface_pressure", "cloud_cover", "cloud_cover_low", "cloud_cover_mid", "cloud_cover_high",
+    "evapotranspiration", "et0_fao_evapotranspiration", "vapour_pressure_deficit", "wind_speed_10m",
+    "wind_speed_100m", "wind_direction_10m", "wind_direction_100m", "wind_gusts_10m",
+    "soil_temperature_0_to_7cm", "soil_temperature_7_to_28cm", "soil_temperature_28_to_100cm",
+    "soil_temperature_100_to_255cm", "soil_moisture_0_to_7cm", "soil_moisture_7_to_28cm",
+    "soil_moisture_28_to_100cm", "soil_moisture_100_to_255cm", "is_day", "sunshine_duration", "albedo",
+    "boundary_layer_height", "total_column_integrated_water_vapour", *RADIATION_HOURLY,
+))
+
+ARCHIVE_DAILY = frozenset((
+    "weather_code", "temperature_2m_max", "temperature_2m_min", "temperature_2m_mean", "apparent_temperature_max",
+    "apparent_temperature_min", "apparent_temperature_mean", "sunrise", "sunset", "daylight_duration",
+    "sunshine_duration", "precipitation_sum", "rain_sum", "snowfall_sum", "precipitation_hours",
+    "wind_speed_10m_max", "wind_speed_10m_min", "wind_speed_10m_mean", "wind_gusts_10m_max", "wind_gusts_10m_min",
+    "wind_gusts_10m_mean", "wind_direction_10m_dominant", "shortwave_radiation_sum", "et0_fao_evapotranspiration",
+    "et0_fao_evapotranspiration_sum", "relative_humidity_2m_max", "relative_humidity_2m_min",
+    "relative_humidity_2m_mean", "dew_point_2m_max", "dew_point_2m_min", "dew_point_2m_mean", "cloud_cover_max",
+    "cloud_cover_min", "cloud_cover_mean", "pressure_msl_max", "pressure_msl_min", "pressure_msl_mean",
+    "surface_pressure_max", "surface_pressure_min", "surface_pressure_mean", "wet_bulb_temperature_2m_max",
+    "wet_bulb_temperature_2m_min", "wet_bulb_temperature_2m_mean", "vapour_pressure_deficit_max",
+    "snowfall_water_equivalent_sum", "soil_moisture_0_to_7cm_mean", "soil_moisture_7_to_28cm_mean",
+    "soil_moisture_28_to_100cm_mean", "soil_moisture_100_to_255cm_mean", "soil_temperature_0_to_7cm_mean",
+    "soil_temperature_7_to_28cm_mean", "soil_temperature_28_to_100cm_mean", "soil_temperature_100_to_255cm_mean",
+))
+
+FORECAST_MODELS = frozenset((
+    "best_match", "ecmwf_ifs", "ecmwf_ifs04", "ecmwf_ifs025", "ecmwf_aifs025", "ecmwf_aifs025_single",
+    "cma_grapes_global", "bom_access_global", "gfs_seamless", "gfs_global", "gfs_hrrr", "gfs_graphcast025",
+    "ncep_nbm_conus", "ncep_nam_conus", "jma_seamless", "jma_msm", "jma_gsm", "kma_seamless", "kma_ldps",
+    "kma_gdps", "icon_seamless", "icon_global", "icon_eu", "icon_d2", "gem_seamless", "gem_global",
+    "gem_regional", "gem_hrdps_continental", "gem_hrdps_west", "meteofrance_seamless", "meteofrance_arpege_world",
+    "meteofrance_arpege_europe", "meteofrance_arome_france", "meteofrance_arome_france_hd",
+    "italia_meteo_arpae_icon_2i", "metno_seamless", "metno_nordic", "knmi_seamless", "knmi_harmonie_arome_europe",
+    "knmi_harmonie_arome_netherlands", "dmi_seamless", "dmi_harmonie_arome_europe", "ukmo_seamless",
+    "ukmo_global_deterministic_10km", "ukmo_uk_deterministic_2km", "meteoswiss_icon_ch1", "meteoswiss_icon_ch2",
+))
+
+ENSEMBLE_MODELS = frozenset((
+    "icon_seamless", "icon_global", "icon_eu", "icon_d2", "gfs_seamless", "gfs025", "gfs05", "ecmwf_ifs04",
+    "ecmwf_ifs025", "ecmwf_aifs025", "gem_global", "bom_access_global_ensemble", "ukmo_global_ensemble_20km",
+    "ukmo_uk_ensemble_2km", "meteoswiss_icon_ch1", "meteoswiss_icon_ch2",
+))
+
+ARCHIVE_MODELS = frozenset((
+    "best_match", "era5_seamless", "era5", "era5_land", "era5_ensemble", "ecmwf_ifs",
+    "ecmwf_ifs_analysis_long_window", "cerra",
+))
+
+# Every forecast variable is archived per model run; is_day does not change between runs
+PREVIOUS_DAY_VARIABLES = FORECAST_HOURLY - {"is_day"}
+
+_PREVIOUS_DAY = re.compile(r"(.+)_previous_day(\d+)$")
+
+
+def _pressure_level_names(variables: Iterable[str] = PRESSURE_LEVEL_VARIABLES) -> frozenset[str]:
+    return frozenset(f"{variable}_{level}hPa" for variable in variables for level in PRESSURE_LEVELS)
+
+
+class Endpoint:
+    """Variables, models and date range served by one Open-Meteo API."""
+
+    def __init__(self, name: str, tool: str, hourly: frozenset[str], daily: frozenset[str],
+                 models: frozenset[str], first_date: date, days_ahead: int, pressure_levels: bool = False,
+                 previous_days: frozenset[str] = frozenset()) -> None:
+        self.name = name
+        self.tool = tool
+        self.surface_hourly = hourly
+        self.hourly = hourly | _pressure_level_names() if pressure_levels else hourly
+        self.daily = daily
+        self.models = models
+        self.first_date = first_date
+        self.days_ahead = days_ahead
+        self.pressure_levels = pressure_levels
+        self.previous_days = previous_days
+
+    def last_date(self) -> date:
+        return date.today() + timedelta(days=self.days_ahead)
+
+    def serves(self, section: str, name: str) -> bool:
+        if name in getattr(self, section):
+            return True
+        match = _PREVIOUS_DAY.match(name) if section == "hourly" else None
+        return (match is not None and match.group(1) in self.previous_days
+                and 1 <= int(match.group(2)) <= MAX_PREVIOUS_DAYS)
+
+
+ENDPOINTS = {
+    endpoint.name: endpoint for endpoint in (
+        Endpoint("forecast", "get_forecast", FORECAST_HOURLY, frozenset(), FORECAST_MODELS,
+                 date(2016, 1, 1), 16, pressure_levels=True),
+        Endpoint("ensemble", "get_ensemble_forecast", ENSEMBLE_HOURLY, frozenset(), ENSEMBLE_MODELS,
+                 date(2023, 1, 1), 35, pressure_levels=True),
+        Endpoint("historical_forecast", "get_historical_forecast", FORECAST_HOURLY, frozenset(),
+                 FORECAST_MODELS, date(2016, 1, 1), 16, pressure_levels=True),
+        Endpoint("previous_runs", "get_previous_model_runs", FORECAST_HOURLY, frozenset(), FORECAST_MODELS,
+                 date(2016, 1, 1), 16, pressure_levels=True, previous_days=PREVIOUS_DAY_VARIABLES),
+        Endpoint("archive", "get_historical_weather", ARCHIVE_HOURLY, ARCHIVE_DAILY, ARCHIVE_MODELS,
+                 date(1940, 1, 1), 0),
+    )
+}
+
+
+def names(value: str | Iterable[str]) -> list[str]:
+    """Split a comma-separated parameter into names, dropping blanks."""
+    items = value.split(",") if isinstance(value, str) else value
+    return [item.strip() for item in items if item.strip()]
+
+
+def previous_day_variants(endpoint: str, variable: str, days: int) -> list[str]:
+    """The ``_previous_dayN`` columns for 1..days, or none if the variable has no earlier runs."""
+    if variable not in ENDPOINTS[endpoint].previous_days:
+        return []
+    return [f"{variable}_previous_day{day}" for day in range(1, days + 1)]
+
+
+@functools.lru_cache(maxsize=1024)
+def _suggestion(endpoint: str, section: str, name: str) -> str:
+    api = ENDPOINTS[endpoint]
+    # Only look among pressure-level names for something that resembles one
+    if section == "hourly" and not name.lower().endswith("hpa"):
+        candidates = api.surface_hourly
+    else:
+        candidates = getattr(api, section)
+    matches = difflib.get_close_matches(name, candidates, n=3, cutoff=0.6)
+    if not matches:
+        return ""
+    quoted = [f"'{match}'" for match in matches]
+    options = " or ".join([", ".join(quoted[:-1]), quoted[-1]] if len(quoted) > 1 else quoted)
+    return f" (did you mean {options}?)"
+
+
+def _problem(kind: str, section: str, name: str, api: Endpoint) -> str:
+    match = _PREVIOUS_DAY.match(name) if section == "hourly" else None
+    if match and match.group(1) in api.previous_days:
+        return f"{kind} '{name}': previous days go from 1 to {MAX_PREVIOUS_DAYS}"
+    others = [endpoint.tool for endpoint in ENDPOINTS.values() if endpoint.serves(section, name)]
+    if others:
+        return f"{kind} '{name}' is not available from {api.tool}, only from {', '.join(others)}"
+    if not getattr(api, section):
+        return f"{api.tool} takes no {section} variables, got '{name}'"
+    return f"Unknown {kind.lower()} '{name}' for {api.tool}{_suggestion(api.name, section, name)}"
+
+
+def _parse_date(field: str, value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{field} must be a date in YYYY-MM-DD format, got '{value}'") from None
+
+
+def validate(endpoint: str, *, hourly: str | Iterable[str] = "", daily: str | Iterable[str] = "",
+             models: str | Iterable[str] = "", start_date: str = "", end_date: str = "") -> None:
+    """Raise ValueError listing every name or date the endpoint cannot serve."""
+    api = ENDPOINTS[endpoint]
+    problems = []
+    for kind, section, value in (("Hourly variable", "hourly", hourly), ("Daily variable", "daily", daily),
+                                 ("Model", "models", models)):
+        problems.extend(_problem(kind, section, name, api) for name in names(value) if not api.serves(section, name))
+    if start_date or end_date:
+        start = _parse_date("start_date", start_date) if start_date else None
+        end = _parse_date("end_date", end_date) if end_date else None
+        if start and end and start > end:
+            problems.append(f"start_date {start} is after end_date {end}")
+        last = api.last_date()
+        for field, day in (("start_date", start), ("end_date", end)):
+            if day and not api.first_date <= day <= last:
+                problems.append(f"{field} {day} is outside the range of {api.tool}, {api.first_date} to {last}")
+    if problems:
+        raise ValueError("; ".join(problems))
+
+
+def describe() -> dict[str, Any]:
+    """The catalog as JSON-serialisable data, for clients planning a request."""
+    return {
+        "pressure_levels": {"variables": list(PRESSURE_LEVEL_VARIABLES), "levels": list(PRESSURE_LEVELS),
+                            "name": "{variable}_{level}hPa"},
+        "endpoints": {
+            endpoint.name: {
+                "tool": endpoint.tool,
+                "first_date": endpoint.first_date.isoformat(),
+                "last_date": endpoint.last_date().isoformat(),
+                "models": sorted(endpoint.models),
+                "hourly": sorted(endpoint.surface_hourly),
+                "daily": sorted(endpoint.daily),
+                "pressure_levels": endpoint.pressure_levels,
+                **({"previous_day_variables": sorted(endpoint.previous_days),
+                    "max_previous_days": MAX_PREVIOUS_DAYS} if endpoint.previous_days else {}),
+            }
+            for endpoint in ENDPOINTS.values()
+        },
+    }
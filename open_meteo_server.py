@@ -1,25 +1,1544 @@
-from typing import Any
+import asyncio
+import atexit
+import bisect
+import contextvars
+import functools
+import gzip
+import hashlib
+import hmac
+import json
+import math
+import operator
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from datetime import date
+from typing import TYPE_CHECKING, Any
 import httpx
+import open_meteo_catalog as catalog
+import open_meteo_tracing as tracing
 from mcp.server.fastmcp import FastMCP
+from open_meteo_tracing import NOOP_SPAN, NoopSpan, Span, httpx_trace_hook, span
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
 from starlette.requests import Request
-from starlette.responses import PlainTextResponse
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+if TYPE_CHECKING:
+    import sqlite3  # imported lazily by SharedResponseCache
+
+
+class OpenMeteoMCP(FastMCP):
+    """FastMCP with a root span around every tool call.
+
+    The span covers argument validation, the tool itself and the conversion of
+    its result into MCP content, so the time it spends beyond its tool.<name>
+    child is serialization cost.
+    """
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> Any:
+        # The content type returned here differs between SDK versions, so it is passed through as is
+        with span("mcp.call_tool", tool=name):
+            return await super().call_tool(name, arguments)
+
+    def streamable_http_app(self) -> Starlette:
+        """The streamable-http app, with tool calls gated by admission control."""
+        app = super().streamable_http_app()
+        app.add_middleware(AdmissionControl, path=self.settings.streamable_http_path)
+        return app
+
 
 # 1) Initialize your FastMCP server with a unique name
-mcp = FastMCP("open-meteo",
+mcp = OpenMeteoMCP("open-meteo",
     stateless_http=True,          # <-- enable stateless HTTP
     host="127.0.0.1",             # bind address
     port=8000)
 
-# 2) Define the Open-Meteo base URL
-OPEN_METEO_API_BASE = "https://api.open-meteo.com/v1/forecast"
-OPEN_METEO_HISTORICAL_API_BASE = "https://historical-forecast-api.open-meteo.com/v1/forecast"
-OPEN_METEO_PREVIOUS_RUNS_API_BASE = "https://previous-runs-api.open-meteo.com/v1/forecast"
-OPEN_METEO_ARCHIVE_API_BASE = "https://archive-api.open-meteo.com/v1/archive"
+# 2) Define the Open-Meteo base URL (overridable, e.g. to point at benchmarks/fake_open_meteo.py)
+OPEN_METEO_API_BASE = os.environ.get(
+    "OPEN_METEO_API_BASE", "https://api.open-meteo.com/v1/forecast")
+OPEN_METEO_HISTORICAL_API_BASE = os.environ.get(
+    "OPEN_METEO_HISTORICAL_API_BASE", "https://historical-forecast-api.open-meteo.com/v1/forecast")
+OPEN_METEO_PREVIOUS_RUNS_API_BASE = os.environ.get(
+    "OPEN_METEO_PREVIOUS_RUNS_API_BASE", "https://previous-runs-api.open-meteo.com/v1/forecast")
+OPEN_METEO_ARCHIVE_API_BASE = os.environ.get(
+    "OPEN_METEO_ARCHIVE_API_BASE", "https://archive-api.open-meteo.com/v1/archive")
+OPEN_METEO_ENSEMBLE_API_BASE = os.environ.get(
+    "OPEN_METEO_ENSEMBLE_API_BASE", "https://ensemble-api.open-meteo.com/v1/ensemble")
+
+# 3) Upstream connection pool, shared by every tool call
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+
+
+_shared_client: tuple[asyncio.AbstractEventLoop, httpx.AsyncClient] | None = None
+
+
+async def _http_client() -> httpx.AsyncClient:
+    """Return the event loop's long-lived client, whose pool is reused across tool calls.
+
+    It is a plain AsyncClient, so HTTP(S)_PROXY, ALL_PROXY and NO_PROXY apply.
+    """
+    global _shared_client
+    loop = asyncio.get_running_loop()
+    if _shared_client is None or _shared_client[0] is not loop:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            event_hooks={"request": [_track_pool_connection]},
+        )
+        # Entered once and never closed, like the pool it owns
+        _shared_client = (loop, await client.__aenter__())
+    return _shared_client[1]
+
+
+# 4) Metrics, rendered in the Prometheus text format by the /metrics route
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class _Metric:
+    """A metric family whose children are keyed by a tuple of label values.
+
+    Updates are plain dict operations so the hot path stays cheap; all
+    formatting work is deferred to ``render``.
+    """
+
+    def __init__(self, name: str, kind: str, help: str, labels: tuple[str, ...],
+                 buckets: tuple[float, ...] = ()) -> None:
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.values: dict[tuple[str, ...], Any] = {}
+
+    def inc(self, key: tuple[str, ...], amount: float = 1) -> None:
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, key: tuple[str, ...], value: float) -> None:
+        self.values[key] = value
+
+    def observe(self, key: tuple[str, ...], value: float) -> None:
+        hist = self.values.get(key)
+        if hist is None:
+            hist = self.values[key] = _Histogram(len(self.buckets) + 1)
+        hist.counts[bisect.bisect_left(self.buckets, value)] += 1
+        hist.sum += value
+        hist.count += 1
+
+    def _labels(self, key: tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.values.items()):
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{self._labels(key)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), value.counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {value.sum}")
+            lines.append(f"{self.name}_count{self._labels(key)} {value.count}")
+        return lines
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+TOOL_CALLS = _Metric("open_meteo_tool_calls_total", "counter",
+                     "Tool invocations by outcome.", ("tool", "outcome"))
+TOOL_DURATION = _Metric("open_meteo_tool_duration_seconds", "histogram",
+                        "Tool invocation latency.", ("tool",), LATENCY_BUCKETS)
+TOOL_IN_FLIGHT = _Metric("open_meteo_tool_in_flight", "gauge",
+                         "Tool invocations currently running.", ("tool",))
+UPSTREAM_REQUESTS = _Metric("open_meteo_upstream_requests_total", "counter",
+                            "Upstream requests by base URL and HTTP status ('error' for transport failures).",
+                            ("base_url", "status"))
+UPSTREAM_DURATION = _Metric("open_meteo_upstream_duration_seconds", "histogram",
+                            "Upstream request latency.", ("base_url",), LATENCY_BUCKETS)
+UPSTREAM_RESPONSE_BYTES = _Metric("open_meteo_upstream_response_bytes", "histogram",
+                                  "Upstream response body size.", ("base_url",), SIZE_BUCKETS)
+UPSTREAM_IN_FLIGHT = _Metric("open_meteo_upstream_in_flight", "gauge",
+                             "Upstream requests currently waiting on Open-Meteo.", ("base_url",))
+CACHE_REQUESTS = _Metric("open_meteo_cache_requests_total", "counter",
+                         "Response cache lookups by result (hit, miss, or coalesced onto an in-flight fetch).",
+                         ("cache", "result"))
+HTTP_POOL_ACTIVE_CONNECTIONS = _Metric("open_meteo_http_pool_active_connections", "gauge",
+                                       "Upstream pool connections carrying a request.", ())
+HTTP_POOL_CONNECTIONS_OPENED = _Metric("open_meteo_http_pool_connections_opened_total", "counter",
+                                       "Upstream connections opened; requests beyond this reused one.", ())
+HTTP_POOL_MAX_CONNECTIONS = _Metric("open_meteo_http_pool_max_connections", "gauge",
+                                    "Configured upstream pool size.", ())
+RESULT_STORE_VALUES = _Metric("open_meteo_result_store_values", "gauge",
+                              "Time-series values held server-side for paged results.", ())
+ADMISSION_QUEUE_DEPTH = _Metric("open_meteo_admission_queue_depth", "gauge",
+                                "Tool calls over HTTP waiting for a concurrency slot.", ("tool",))
+ADMISSION_WAIT = _Metric("open_meteo_admission_wait_seconds", "histogram",
+                         "Time tool calls over HTTP waited for a concurrency slot.", ("tool",), LATENCY_BUCKETS)
+ADMISSION_SHED = _Metric("open_meteo_admission_shed_total", "counter",
+                         "Tool calls over HTTP rejected by admission control, by reason.", ("tool", "reason"))
+
+METRICS = [
+    TOOL_CALLS, TOOL_DURATION, TOOL_IN_FLIGHT,
+    UPSTREAM_REQUESTS, UPSTREAM_DURATION, UPSTREAM_RESPONSE_BYTES, UPSTREAM_IN_FLIGHT,
+    CACHE_REQUESTS, HTTP_POOL_ACTIVE_CONNECTIONS, HTTP_POOL_CONNECTIONS_OPENED, HTTP_POOL_MAX_CONNECTIONS,
+    RESULT_STORE_VALUES,
+    ADMISSION_QUEUE_DEPTH, ADMISSION_WAIT, ADMISSION_SHED,
+]
+
+
+HTTP_POOL_MAX_CONNECTIONS.set((), HTTP_MAX_CONNECTIONS)
+
+
+async def _track_pool_connection(request: httpx.Request) -> None:
+    """Request hook following the request's pool connection through httpcore trace events.
+
+    The request holds a connection from its first event until its response is
+    closed or a phase fails; a connect_tcp event means no idle one was reused.
+    Any trace callback already on the request (see tracing) still gets every event.
+    """
+    inner = request.extensions.get("trace")
+    state = "waiting"
+
+    async def trace(event_name: str, info: dict[str, Any]) -> None:
+        nonlocal state
+        phase, _, event = event_name.rpartition(".")
+        if state == "waiting" and event == "started":
+            state = "held"
+            HTTP_POOL_ACTIVE_CONNECTIONS.inc(())
+        if phase == "connection.connect_tcp" and event == "complete":
+            HTTP_POOL_CONNECTIONS_OPENED.inc(())
+        if state == "held" and (event == "failed" or (phase.endswith("response_closed") and event == "complete")):
+            state = "released"
+            HTTP_POOL_ACTIVE_CONNECTIONS.inc((), -1)
+        if inner is not None:
+            await inner(event_name, info)
+
+    request.extensions["trace"] = trace
+
+
+# In multi-worker mode every worker periodically dumps its raw values into
+# OPEN_METEO_METRICS_DIR, and whichever worker serves /metrics sums them all.
+# A snapshot that has not been refreshed for METRICS_SNAPSHOT_STALE_AFTER
+# belongs to a worker that exited: its counters and histograms still count
+# towards the totals, but its gauges no longer describe anything live.
+METRICS_DIR = os.environ.get("OPEN_METEO_METRICS_DIR", "")
+METRICS_SNAPSHOT_INTERVAL = 1.0
+METRICS_SNAPSHOT_STALE_AFTER = 5 * METRICS_SNAPSHOT_INTERVAL
+
+
+def _metrics_snapshot() -> dict[str, list[Any]]:
+    snapshot = {}
+    for metric in METRICS:
+        rows = []
+        for key, value in metric.values.copy().items():
+            if metric.kind == "histogram":
+                value = [list(value.counts), value.sum, value.count]
+            rows.append([list(key), value])
+        snapshot[metric.name] = rows
+    return snapshot
+
+
+def _write_metrics_snapshots() -> None:
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    while True:
+        time.sleep(METRICS_SNAPSHOT_INTERVAL)
+        with open(path + ".tmp", "w") as out:
+            json.dump(_metrics_snapshot(), out)
+        os.replace(path + ".tmp", path)
+
+
+def _merged_metrics() -> list[_Metric]:
+    """Sum this worker's live values with the latest snapshots of its siblings."""
+    snapshots = [(_metrics_snapshot(), True)]
+    now = time.time()
+    for name in os.listdir(METRICS_DIR):
+        if name.endswith(".json") and name != f"{os.getpid()}.json":
+            path = os.path.join(METRICS_DIR, name)
+            try:
+                live = now - os.stat(path).st_mtime <= METRICS_SNAPSHOT_STALE_AFTER
+                with open(path) as snapshot:
+                    snapshots.append((json.load(snapshot), live))
+            except (OSError, ValueError):
+                continue
+    merged = []
+    for metric in METRICS:
+        total = _Metric(metric.name, metric.kind, metric.help, metric.labels, metric.buckets)
+        for snapshot, live in snapshots:
+            if metric.kind == "gauge" and not live:
+                continue
+            for key, value in snapshot.get(metric.name, []):
+                if metric.kind != "histogram":
+                    total.inc(tuple(key), value)
+                    continue
+                hist = total.values.setdefault(tuple(key), _Histogram(len(metric.buckets) + 1))
+                counts, hist_sum, hist_count = value
+                hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+                hist.sum += hist_sum
+                hist.count += hist_count
+        merged.append(total)
+    return merged
+
+
+def render_metrics() -> str:
+    metrics = _merged_metrics() if METRICS_DIR else METRICS
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+if METRICS_DIR:
+    threading.Thread(target=_write_metrics_snapshots, name="open-meteo-metrics", daemon=True).start()
+
+
+# 5) Tracing and profiling (open_meteo_tracing.py), exposed by the /admin routes
+ADMIN_TOKEN = os.environ.get("OPEN_METEO_ADMIN_TOKEN", "")
+
+
+# 6) Traffic capture for offline replay (see benchmarks/fake_open_meteo.py --replay)
+CAPTURE_FILE = os.environ.get("OPEN_METEO_CAPTURE_FILE", "")
+
+# Lets a capture say which upstream a request went to independently of the URL in use
+UPSTREAM_NAMES = {
+    OPEN_METEO_API_BASE: "OPEN_METEO_API_BASE",
+    OPEN_METEO_HISTORICAL_API_BASE: "OPEN_METEO_HISTORICAL_API_BASE",
+    OPEN_METEO_PREVIOUS_RUNS_API_BASE: "OPEN_METEO_PREVIOUS_RUNS_API_BASE",
+    OPEN_METEO_ARCHIVE_API_BASE: "OPEN_METEO_ARCHIVE_API_BASE",
+    OPEN_METEO_ENSEMBLE_API_BASE: "OPEN_METEO_ENSEMBLE_API_BASE",
+}
+
+
+class TrafficRecorder:
+    """Appends tool calls and upstream exchanges to a gzip'd JSON-lines file.
+
+    Records are queued from the event loop and written by a background thread,
+    so capturing does not block tool calls on compression or disk I/O. Each
+    record carries ``t``, its start offset in seconds from the beginning of the
+    capture, which is what replay uses to reproduce the arrival pattern.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # Offsets count from here; the header carries the same instant as wall-clock time
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self._queue: queue.SimpleQueue[dict[str, Any] | None] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, start: float, **fields: Any) -> None:
+        if self._thread is None:
+            # The writer starts with the first record, keeping it off the startup path
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="open-meteo-capture", daemon=True)
+                    self._thread.start()
+        self._queue.put({"type": kind, "t": round(start - self.started, 6), **fields})
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        # Every batch becomes a complete gzip member, so the file stays readable
+        # even if the process is killed without running atexit handlers.
+        lines = [json.dumps({"type": "header", "version": 1, "started": self.started_at})]
+        with open(self.path, "ab") as out:
+            while True:
+                item = self._queue.get()
+                if item is not None:
+                    lines.append(json.dumps(item, separators=(",", ":")))
+                if lines and (item is None or self._queue.empty()):
+                    out.write(gzip.compress(("\n".join(lines) + "\n").encode()))
+                    out.flush()
+                    lines = []
+                if item is None:
+                    return
+
+
+def _query_value(value: Any) -> str:
+    """Render a param the way httpx puts it on the query string."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else str(value)
+
+
+traffic_recorder: TrafficRecorder | None = None
+if CAPTURE_FILE:
+    traffic_recorder = TrafficRecorder(CAPTURE_FILE)
+    atexit.register(traffic_recorder.close)
+
+_current_tool: contextvars.ContextVar[str | None] = contextvars.ContextVar("open_meteo_current_tool", default=None)
+
+
+# 7) Response cache shared by all worker processes
+# Enabled by OPEN_METEO_CACHE_PATH, which --workers sets automatically. Entries
+# live for CACHE_TTL_SECONDS per upstream; concurrent identical requests are
+# collapsed into one upstream fetch within a worker (a shared future) and across
+# workers (a lease row in the cache database).
+CACHE_PATH = os.environ.get("OPEN_METEO_CACHE_PATH", "")
+CACHE_TTL_SECONDS = {
+    OPEN_METEO_API_BASE: 900,
+    OPEN_METEO_HISTORICAL_API_BASE: 86400,
+    OPEN_METEO_PREVIOUS_RUNS_API_BASE: 3600,
+    OPEN_METEO_ARCHIVE_API_BASE: 86400,
+    OPEN_METEO_ENSEMBLE_API_BASE: 3600,
+}
+CACHE_MAX_ENTRIES = int(os.environ.get("OPEN_METEO_CACHE_MAX_ENTRIES", "10000"))
+
+
+class SharedResponseCache:
+    """Upstream response bodies in one SQLite file, safe to share between processes.
+
+    Blocking SQLite calls run in worker threads, each with its own connection.
+    A lease row marks a key as being fetched; other processes wait for the
+    owner's result instead of repeating the request, and take over if the
+    lease expires.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 30.0, max_entries: int = CACHE_MAX_ENTRIES) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_entries = max_entries
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self._local = threading.local()
+        self._puts = 0
+
+    def _db(self) -> "sqlite3.Connection":
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Imported and opened on first use, so the cache costs nothing at startup
+            import sqlite3
+
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body BLOB, expires REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, expires REAL)")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def key(url: str, params: dict[str, Any]) -> str:
+        query = "&".join(f"{k}={_query_value(v)}" for k, v in sorted(params.items()))
+        return hashlib.sha256(f"{url}?{query}".encode()).hexdigest()
+
+    def get_sync(self, key: str) -> bytes | None:
+        row = self._db().execute(
+            "SELECT body FROM responses WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def entry_sync(self, key: str) -> tuple[bytes, float] | None:
+        """A live body with its remaining lifetime in seconds."""
+        now = time.time()
+        row = self._db().execute(
+            "SELECT body, expires FROM responses WHERE key = ? AND expires > ?", (key, now)
+        ).fetchone()
+        return (row[0], row[1] - now) if row else None
+
+    def put_sync(self, key: str, body: bytes, ttl: float) -> None:
+        db = self._db()
+        now = time.time()
+        db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, body, now + ttl))
+        self._puts += 1
+        if self._puts % 256 == 0:
+            db.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+            db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def acquire_sync(self, key: str) -> bool:
+        now = time.time()
+        cursor = self._db().execute(
+            "INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE "
+            "SET owner = excluded.owner, expires = excluded.expires WHERE leases.expires <= ?",
+            (key, self.owner, now + self.lease_seconds, now),
+        )
+        return cursor.rowcount == 1
+
+    def release_sync(self, key: str) -> None:
+        self._db().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def leased_sync(self, key: str) -> bool:
+        row = self._db().execute(
+            "SELECT 1 FROM leases WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    async def get(self, key: str) -> bytes | None:
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def entry(self, key: str) -> tuple[bytes, float] | None:
+        return await asyncio.to_thread(self.entry_sync, key)
+
+    async def put(self, key: str, body: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self.put_sync, key, body, ttl)
+
+    async def acquire(self, key: str) -> bool:
+        return await asyncio.to_thread(self.acquire_sync, key)
+
+    async def release(self, key: str) -> None:
+        await asyncio.to_thread(self.release_sync, key)
+
+    async def wait(self, key: str, poll: float = 0.02) -> tuple[bytes, float] | None:
+        """Wait for another process's fetch; None once its lease is gone without a result."""
+        while True:
+            entry = await self.entry(key)
+            if entry is not None or not await asyncio.to_thread(self.leased_sync, key):
+                return entry
+            await asyncio.sleep(poll)
+
+
+response_cache: SharedResponseCache | None = SharedResponseCache(CACHE_PATH) if CACHE_PATH else None
+_inflight: dict[str, asyncio.Future[tuple[bytes, float]]] = {}
+
+
+# 8) Instrumentation shared by every tool and upstream fetch
+def _instrumented(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Record call counts, latency and concurrency for a tool function."""
+    key = (fn.__name__,)
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        TOOL_IN_FLIGHT.inc(key)
+        token = _current_tool.set(fn.__name__)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with span(f"tool.{fn.__name__}"):
+                result = await fn(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            TOOL_DURATION.observe(key, elapsed)
+            TOOL_CALLS.inc((fn.__name__, outcome))
+            TOOL_IN_FLIGHT.inc(key, -1)
+            _current_tool.reset(token)
+            if traffic_recorder is not None:
+                traffic_recorder.record("tool", start, tool=fn.__name__, arguments=kwargs,
+                                        duration_ms=round(elapsed * 1000, 3), outcome=outcome)
+
+    return wrapper
+
+
+async def _upstream_get(url: str, params: dict[str, Any], upstream: Span | NoopSpan) -> httpx.Response:
+    """GET an Open-Meteo endpoint, recording metrics and capture data for the exchange."""
+    key = (url,)
+    UPSTREAM_IN_FLIGHT.inc(key)
+    start = time.perf_counter()
+    status = "error"
+    try:
+        # Per-phase timing is requested from httpcore only for sampled traces
+        extra = {} if upstream is NOOP_SPAN else {"extensions": {"trace": httpx_trace_hook(upstream)}}
+        client = await _http_client()
+        resp = await client.get(url, params=params, **extra)
+        status = str(resp.status_code)
+        upstream.set("http.status_code", resp.status_code)
+        UPSTREAM_RESPONSE_BYTES.observe(key, len(resp.content))
+        if traffic_recorder is not None:
+            traffic_recorder.record(
+                "upstream", start,
+                tool=_current_tool.get(),
+                api=UPSTREAM_NAMES.get(url, url),
+                params={k: _query_value(v) for k, v in params.items()},
+                status=resp.status_code,
+                duration_ms=round((time.perf_counter() - start) * 1000, 3),
+                body=resp.text,
+            )
+        resp.raise_for_status()
+        return resp
+    finally:
+        UPSTREAM_DURATION.observe(key, time.perf_counter() - start)
+        UPSTREAM_REQUESTS.inc((url, status))
+        UPSTREAM_IN_FLIGHT.inc(key, -1)
+
+
+async def _fetch_json(url: str, params: dict[str, Any]) -> dict[str, Any]:
+    """GET an Open-Meteo endpoint and return the decoded JSON body."""
+    return (await _fetch_json_ttl(url, params))[0]
+
+
+async def _fetch_json_ttl(url: str, params: dict[str, Any]) -> tuple[dict[str, Any], float]:
+    """Like ``_fetch_json``, plus how many seconds the body may still be served.
+
+    That is the upstream's full TTL for a fresh fetch, and what is left of the
+    shared cache row for a body fetched earlier, possibly by another worker.
+    """
+    if response_cache is not None:
+        return await _fetch_json_cached(url, params)
+    return await _fetch_json_upstream(url, params), CACHE_TTL_SECONDS.get(url, 900)
+
+
+async def _fetch_json_upstream(url: str, params: dict[str, Any]) -> dict[str, Any]:
+    """GET straight from the upstream, leaving the response cache alone."""
+    with span("upstream", url=url) as upstream:
+        resp = await _upstream_get(url, params, upstream)
+        with span("json.decode"):
+            return resp.json()
+
+
+async def _fetch_json_cached(url: str, params: dict[str, Any]) -> tuple[dict[str, Any], float]:
+    key = response_cache.key(url, params)
+    with span("cache.lookup"):
+        entry = await response_cache.entry(key)
+    if entry is not None:
+        CACHE_REQUESTS.inc(("shared", "hit"))
+    elif (pending := _inflight.get(key)) is not None:
+        CACHE_REQUESTS.inc(("shared", "coalesced"))
+        try:
+            entry = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # The fetch we joined was cancelled by its own caller, not us: retry
+            if asyncio.current_task().cancelling() or not pending.cancelled():
+                raise
+            return await _fetch_json_cached(url, params)
+    else:
+        CACHE_REQUESTS.inc(("shared", "miss"))
+        pending = _inflight[key] = asyncio.get_running_loop().create_future()
+        # Avoid "exception never retrieved" warnings when nobody else was waiting
+        pending.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            entry = await _fetch_shared(url, params, key)
+            pending.set_result(entry)
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except BaseException as exc:
+            pending.set_exception(exc)
+            raise
+        finally:
+            del _inflight[key]
+    body, ttl = entry
+    with span("json.decode"):
+        return json.loads(body), ttl
+
+
+async def _fetch_shared(url: str, params: dict[str, Any], key: str) -> tuple[bytes, float]:
+    """Fetch under the cross-process lease, or wait for the process holding it."""
+    while True:
+        if await response_cache.acquire(key):
+            try:
+                with span("upstream", url=url) as upstream:
+                    body = (await _upstream_get(url, params, upstream)).content
+                ttl = CACHE_TTL_SECONDS.get(url, 900)
+                await response_cache.put(key, body, ttl)
+                return body, ttl
+            finally:
+                await response_cache.release(key)
+        with span("cache.wait"):
+            entry = await response_cache.wait(key)
+        if entry is not None:
+            return entry
+
+
+# 9) Large results, kept server-side and paged through as MCP resources
+# A result with more than INLINE_RESULT_MAX_VALUES time-series values is not
+# returned inline: the tool returns its metadata plus a resource URI, and the
+# client reads it in pages of rows, by time window or by variable. Result ids
+# are the shared cache key of the upstream request, so with --workers any
+# worker can serve pages of a result fetched by another.
+INLINE_RESULT_MAX_VALUES = int(os.environ.get("OPEN_METEO_INLINE_RESULT_MAX_VALUES", "20000"))
+RESULT_PAGE_ROWS = int(os.environ.get("OPEN_METEO_RESULT_PAGE_ROWS", "744"))  # 31 days of hours
+RESULT_STORE_MAX_VALUES = int(os.environ.get("OPEN_METEO_RESULT_STORE_MAX_VALUES", "2000000"))
+RESULT_SECTIONS = ("minutely_15", "hourly", "daily")
+RESULT_URI = "open-meteo://results/{result_id}"
+
+
+def _result_values(data: dict[str, Any]) -> int:
+    """Count the time-series values in an Open-Meteo response."""
+    return sum(
+        len(column)
+        for section in RESULT_SECTIONS if isinstance(data.get(section), dict)
+        for column in data[section].values() if isinstance(column, list)
+    )
+
+
+class ResultStore:
+    """Large tool results held in memory, bounded by their total value count.
+
+    Entries expire with the upstream's cache TTL; when the store is full the
+    least recently read result is evicted first.
+    """
+
+    def __init__(self, max_values: int = RESULT_STORE_MAX_VALUES) -> None:
+        self.max_values = max_values
+        self.values = 0
+        self._entries: OrderedDict[str, tuple[dict[str, Any], int, float]] = OrderedDict()
+
+    def put(self, result_id: str, data: dict[str, Any], ttl: float) -> None:
+        self.pop(result_id)
+        size = _result_values(data)
+        self._entries[result_id] = (data, size, time.monotonic() + ttl)
+        self.values += size
+        while self.values > self.max_values and len(self._entries) > 1:
+            self.pop(next(iter(self._entries)))
+        RESULT_STORE_VALUES.set((), self.values)
+
+    def get(self, result_id: str) -> dict[str, Any] | None:
+        entry = self._entries.get(result_id)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            self.pop(result_id)
+            return None
+        self._entries.move_to_end(result_id)
+        return entry[0]
+
+    def expires_in(self, result_id: str) -> float:
+        entry = self._entries.get(result_id)
+        return max(0.0, round(entry[2] - time.monotonic(), 1)) if entry else 0.0
+
+    def pop(self, result_id: str) -> None:
+        entry = self._entries.pop(result_id, None)
+        if entry is not None:
+            self.values -= entry[1]
+            RESULT_STORE_VALUES.set((), self.values)
+
+
+result_store = ResultStore()
+
+
+def _result_summary(result_id: str, data: dict[str, Any], ttl: float) -> dict[str, Any]:
+    """Everything but the time series, plus how to page through them."""
+    uri = RESULT_URI.format(result_id=result_id)
+    sections = {}
+    for section in RESULT_SECTIONS:
+        columns = data.get(section)
+        if not isinstance(columns, dict):
+            continue
+        times = columns.get("time", [])
+        sections[section] = {
+            "variables": [name for name in columns if name != "time"],
+            "rows": len(times),
+            "start": times[0] if times else None,
+            "end": times[-1] if times else None,
+            "pages": -(-len(times) // RESULT_PAGE_ROWS),
+            "first_page": f"{uri}/{section}/page/0",
+        }
+    summary = {key: value for key, value in data.items() if key not in RESULT_SECTIONS}
+    summary["result"] = {
+        "id": result_id,
+        "uri": uri,
+        "expires_in_seconds": round(ttl, 1),
+        "sections": sections,
+        "page_uri": f"{uri}/{{section}}/page/{{page}}",
+        "window_uri": f"{uri}/{{section}}/{{variables}}/{{start}}/{{end}}",
+        "note": "Too large to return inline. Read the pages with the read_result tool or these resource URIs.",
+    }
+    return summary
+
+
+def _result_page(result_id: str, data: dict[str, Any], section: str, variables: str = "all",
+                 start: str = "", end: str = "", page: int | None = None) -> dict[str, Any]:
+    """Slice one section of a stored result by row page or by time window, and by variable."""
+    columns = data.get(section)
+    if not isinstance(columns, dict):
+        available = [name for name in RESULT_SECTIONS if isinstance(data.get(name), dict)]
+        raise ValueError(f"Result has no {section!r} data; available: {', '.join(available)}")
+    names = [name for name in columns if name != "time"]
+    if variables and variables != "all":
+        wanted = [name.strip() for name in variables.split(",") if name.strip()]
+        unknown = [name for name in wanted if name not in columns]
+        if unknown:
+            raise ValueError(f"Unknown variable(s) {', '.join(unknown)}; result has {', '.join(names)}")
+        names = wanted
+    times = columns.get("time", [])
+    if page is not None:
+        if page < 0 or (page > 0 and page * RESULT_PAGE_ROWS >= len(times)):
+            raise ValueError(f"page must be between 0 and {max(0, -(-len(times) // RESULT_PAGE_ROWS) - 1)}")
+        lo, hi = page * RESULT_PAGE_ROWS, min((page + 1) * RESULT_PAGE_ROWS, len(times))
+    else:
+        # ISO 8601 timestamps sort as strings; an end date includes that whole day
+        lo = bisect.bisect_left(times, start) if start else 0
+        hi = bisect.bisect_right(times, end + "~") if end else len(times)
+        limit = max(RESULT_PAGE_ROWS, INLINE_RESULT_MAX_VALUES // max(1, len(names)))
+        truncated = hi - lo > limit
+        hi = min(hi, lo + limit)
+    units = data.get(f"{section}_units", {})
+    result = {
+        "result_id": result_id,
+        "section": section,
+        "offset": lo,
+        "rows": max(0, hi - lo),
+        "total_rows": len(times),
+        f"{section}_units": {name: units[name] for name in ("time", *names) if name in units},
+        section: {name: columns[name][lo:hi] for name in ("time", *names) if name in columns},
+    }
+    uri = RESULT_URI.format(result_id=result_id)
+    if page is not None and hi < len(times):
+        result["next"] = f"{uri}/{section}/page/{page + 1}"
+    elif page is None and truncated:
+        result["next"] = f"{uri}/{section}/{variables or 'all'}/{times[hi]}/{end or times[-1]}"
+    return result
+
+
+async def _load_result(result_id: str) -> dict[str, Any]:
+    data = result_store.get(result_id)
+    if data is None and response_cache is not None:
+        # Fetched by another worker: the id is the upstream body's shared cache
+        # key, and the result lives as long as that row does
+        entry = await response_cache.entry(result_id)
+        if entry is not None:
+            data = json.loads(entry[0])
+            result_store.put(result_id, data, entry[1])
+    if data is None:
+        raise ValueError(f"Result {result_id} has expired or does not exist; repeat the original tool call")
+    return data
+
+
+async def _fetch_result(url: str, params: dict[str, Any], chunks: list[dict[str, Any]] | None = None,
+                        partial_results: bool = False) -> dict[str, Any]:
+    """Like ``_fetch_json``, but large results are stored and summarised instead of inlined.
+
+    ``chunks`` (from ``_plan_chunks``) splits the fetch into several upstream
+    requests whose responses are merged back into one.
+    """
+    if chunks is not None and len(chunks) > 1:
+        data, ttl = await _fetch_chunked(url, chunks, partial_results)
+    else:
+        data, ttl = await _fetch_json_ttl(url, params)
+    if _result_values(data) <= INLINE_RESULT_MAX_VALUES:
+        return data
+    result_id = SharedResponseCache.key(url, params)
+    with span("result.store"):
+        result_store.put(result_id, data, ttl)
+        if response_cache is not None and chunks is not None and len(chunks) > 1:
+            # Chunks are cached under their own keys; other workers look up the whole
+            await response_cache.put(result_id, json.dumps(data).encode(), ttl)
+        return _result_summary(result_id, data, ttl)
+
+
+# 10) Long pulls, fetched in chunks with progress and partial results
+# A request estimated at more than CHUNK_MAX_VALUES values is split per
+# calendar year (and, for previous runs, per variable while a year is still
+# too large), and the chunks are fetched CHUNK_CONCURRENCY at a time. Every
+# finished chunk is reported as an MCP progress notification and, if the
+# caller asked for partial results, sent as a log notification carrying the
+# chunk's data. Cancelling the tool call cancels the chunk tasks, which
+# aborts their upstream requests.
+CHUNK_MAX_VALUES = int(os.environ.get("OPEN_METEO_CHUNK_MAX_VALUES", "50000"))
+CHUNK_CONCURRENCY = int(os.environ.get("OPEN_METEO_CHUNK_CONCURRENCY", "4"))
+PARTIAL_RESULT_LOGGER = "open_meteo.partial"
+
+
+def _plan_chunks(params: dict[str, Any], groups: list[list[str]], daily: int = 0) -> list[dict[str, Any]]:
+    """Split a date-range request into upstream requests of bounded size.
+
+    ``groups`` are the hourly variables, in groups that must stay together,
+    and ``daily`` is the number of daily variables. Every model requested
+    gets its own columns. Small requests come back as the single original
+    request.
+    """
+    try:
+        first, last = date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+    except ValueError:
+        return [params]  # let Open-Meteo report the bad date
+    models = len(params["models"].split(",")) if params.get("models") else 1
+    per_day = (24 * sum(len(group) for group in groups) + daily) * models
+    if ((last - first).days + 1) * per_day <= CHUNK_MAX_VALUES:
+        return [params]
+    windows = [
+        (max(first, date(year, 1, 1)), min(last, date(year, 12, 31))) for year in range(first.year, last.year + 1)
+    ]
+    longest = max((hi - lo).days + 1 for lo, hi in windows)
+    split_groups = len(groups) > 1 and longest * per_day > CHUNK_MAX_VALUES
+    chunks = []
+    for lo, hi in windows:
+        for index, group in enumerate(groups if split_groups else [sum(groups, [])]):
+            chunk = {**params, "start_date": lo.isoformat(), "end_date": hi.isoformat()}
+            if group:
+                chunk["hourly"] = ",".join(group)
+            if index > 0:
+                chunk.pop("daily", None)  # daily columns come with the first group only
+            chunks.append(chunk)
+    return chunks
+
+
+def _merge_chunks(chunks: list[dict[str, Any]], results: list[dict[str, Any]]) -> dict[str, Any]:
+    """Reassemble chunk responses: groups of one window side by side, windows end to end."""
+    merged = {key: value for key, value in results[0].items() if key not in RESULT_SECTIONS}
+    windows: dict[tuple[str, str], dict[str, dict[str, list[Any]]]] = {}
+    for chunk, result in zip(chunks, results):
+        window = windows.setdefault((chunk["start_date"], chunk["end_date"]), {})
+        for section in RESULT_SECTIONS:
+            if isinstance(result.get(section), dict):
+                window.setdefault(section, {}).update(result[section])
+            if isinstance(result.get(f"{section}_units"), dict):
+                merged.setdefault(f"{section}_units", {}).update(result[f"{section}_units"])
+    for window in windows.values():
+        for section, columns in window.items():
+            target = merged.setdefault(section, {})
+            for name, column in columns.items():
+                target.setdefault(name, []).extend(column)
+    return merged
+
+
+def _request_context() -> Any:
+    try:
+        return mcp._mcp_server.request_context
+    except LookupError:
+        return None  # called directly rather than through an MCP request
+
+
+async def _report_progress(progress: int, total: int, message: str) -> None:
+    """Send a progress notification if the caller asked for them with a progress token."""
+    ctx = _request_context()
+    if ctx is None or ctx.meta is None or ctx.meta.progressToken is None:
+        return
+    # related_request_id routes the notification onto the request's own HTTP response stream
+    await ctx.session.send_progress_notification(
+        ctx.meta.progressToken, progress, total, message=message, related_request_id=ctx.request_id
+    )
+
+
+async def _send_partial_result(data: dict[str, Any]) -> None:
+    ctx = _request_context()
+    if ctx is not None:
+        await ctx.session.send_log_message(
+            "info", data, logger=PARTIAL_RESULT_LOGGER, related_request_id=ctx.request_id
+        )
+
+
+async def _fetch_chunked(url: str, chunks: list[dict[str, Any]],
+                         partial_results: bool) -> tuple[dict[str, Any], float]:
+    """Fetch chunks concurrently, reporting each one as it completes, and merge them.
+
+    The merged result may be served for as long as its shortest-lived chunk.
+    """
+    results: list[dict[str, Any]] = [{}] * len(chunks)
+    ttls: list[float] = [0.0] * len(chunks)
+    limit = asyncio.Semaphore(CHUNK_CONCURRENCY)
+    done = 0
+
+    async def fetch(index: int) -> None:
+        nonlocal done
+        chunk = chunks[index]
+        async with limit:
+            with span("chunk", index=index, start_date=chunk["start_date"], end_date=chunk["end_date"]):
+                results[index], ttls[index] = await _fetch_json_ttl(url, chunk)
+        done += 1
+        await _report_progress(done, len(chunks), f"fetched {chunk['start_date']} to {chunk['end_date']}")
+        if partial_results:
+            await _send_partial_result({
+                "chunk": index,
+                "chunks": len(chunks),
+                "start_date": chunk["start_date"],
+                "end_date": chunk["end_date"],
+                "result": results[index],
+            })
+
+    tasks = [asyncio.ensure_future(fetch(index)) for index in range(len(chunks))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # On an error or cancellation, abort the chunks still queued or in flight
+        for task in tasks:
+            task.cancel()
+    with span("chunks.merge"):
+        return _merge_chunks(chunks, results), min(ttls)
+
+
+# 11) Streaming exports of archive pulls to local files
+# export_historical_weather writes each section (hourly, daily) of an archive
+# pull to its own file in OPEN_METEO_EXPORT_DIR, chunk by chunk in date order
+# as the yearly requests complete, so memory stays bounded by
+# CHUNK_CONCURRENCY chunks however long the range is. Parquet and Arrow IPC
+# need pyarrow (the "export" extra); without it exports fall back to CSV.
+EXPORT_DIR = os.environ.get("OPEN_METEO_EXPORT_DIR", "")
+EXPORT_FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+
+
+class _CsvSectionWriter:
+    def __init__(self, path: str) -> None:
+        import csv
+
+        self._file = open(path, "w", newline="")
+        self._csv = csv.writer(self._file)
+        self.columns: list[str] = []
+
+    def write(self, columns: dict[str, list[Any]]) -> None:
+        if not self.columns:
+            self.columns = list(columns)
+            self._csv.writerow(self.columns)
+        rows = len(columns.get("time", []))
+        self._csv.writerows(zip(*(columns.get(name, [None] * rows) for name in self.columns)))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ArrowSectionWriter:
+    """Parquet (a row group per chunk) or Arrow IPC file (a record batch per chunk)."""
+
+    def __init__(self, path: str, metadata: dict[str, Any], file_format: str) -> None:
+        self.path = path
+        self.metadata = metadata
+        self.file_format = file_format
+        self.columns: list[str] = []
+        self._schema: Any = None
+        self._writer: Any = None
+
+    def _open(self, columns: dict[str, list[Any]]) -> None:
+        import pyarrow as pa
+
+        fields = []
+        for name, values in columns.items():
+            if name == "time":
+                kind = pa.date32() if values and len(values[0]) == 10 else pa.timestamp("s")
+            elif any(isinstance(value, str) for value in values):
+                kind = pa.string()  # e.g. daily sunrise and sunset
+            else:
+                kind = pa.float64()
+            fields.append(pa.field(name, kind))
+        self.columns = list(columns)
+        self._schema = pa.schema(fields, metadata={"open_meteo": json.dumps(self.metadata)})
+        if self.file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self.path, self._schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(self.path, self._schema)
+
+    def write(self, columns: dict[str, list[Any]]) -> None:
+        import pyarrow as pa
+
+        if self._writer is None:
+            self._open(columns)
+        rows = len(columns.get("time", []))
+        arrays = [pa.array(columns.get(field.name, [None] * rows)).cast(field.type) for field in self._schema]
+        self._writer.write_batch(pa.record_batch(arrays, schema=self._schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _export_path(params: dict[str, Any], section: str, extension: str) -> str:
+    directory = EXPORT_DIR
+    if not directory:
+        import tempfile
+
+        directory = os.path.join(tempfile.gettempdir(), "open-meteo-exports")
+    os.makedirs(directory, exist_ok=True)
+    digest = SharedResponseCache.key(OPEN_METEO_ARCHIVE_API_BASE, params)[:12]
+    name = f"archive_{params['latitude']}_{params['longitude']}_{params['start_date']}_{params['end_date']}"
+    return os.path.join(directory, f"{name}_{digest}_{section}{extension}")
+
+
+async def _export_chunks(url: str, params: dict[str, Any], chunks: list[dict[str, Any]],
+                         file_format: str) -> dict[str, Any]:
+    """Fetch chunks in date order, appending each section to its file as it arrives."""
+    writers: dict[str, _CsvSectionWriter | _ArrowSectionWriter] = {}
+    parts: dict[str, str] = {}
+    files: dict[str, dict[str, Any]] = {}
+    metadata: dict[str, Any] = {}
+    ahead: deque[asyncio.Future[dict[str, Any]]] = deque()
+    queued = 0
+    try:
+        for index in range(len(chunks)):
+            # Keep at most CHUNK_CONCURRENCY fetches ahead of the writer. Chunks
+            # bypass the shared cache, which bulk exports would otherwise flood
+            while queued < len(chunks) and len(ahead) < CHUNK_CONCURRENCY:
+                ahead.append(asyncio.ensure_future(_fetch_json_upstream(url, chunks[queued])))
+                queued += 1
+            data = await ahead.popleft()
+            if not metadata:
+                metadata = {key: value for key, value in data.items() if key not in RESULT_SECTIONS}
+            for section in RESULT_SECTIONS:
+                columns = data.get(section)
+                if not isinstance(columns, dict):
+                    continue
+                if section not in writers:
+                    path = _export_path(params, section, EXPORT_FORMATS[file_format])
+                    # Identical exports may run at once: each writes its own file, the last rename wins
+                    parts[section] = part = f"{path}.{os.getpid()}-{uuid.uuid4().hex[:8]}.part"
+                    writers[section] = (
+                        _CsvSectionWriter(part) if file_format == "csv"
+                        else _ArrowSectionWriter(part, metadata, file_format)
+                    )
+                    files[section] = {"path": path, "rows": 0, "start": None, "end": None}
+                times = columns.get("time", [])
+                with span("export.write", section=section, rows=len(times)):
+                    await asyncio.to_thread(writers[section].write, columns)
+                info = files[section]
+                info["rows"] += len(times)
+                if times:
+                    info["start"] = info["start"] or times[0]
+                    info["end"] = times[-1]
+            chunk = chunks[index]
+            await _report_progress(index + 1, len(chunks), f"wrote {chunk['start_date']} to {chunk['end_date']}")
+    except BaseException:
+        for task in ahead:
+            task.cancel()
+        for section, writer in writers.items():
+            writer.close()
+            with suppress(FileNotFoundError):
+                os.remove(parts[section])
+        raise
+    for section, writer in writers.items():
+        writer.close()
+        info = files[section]
+        os.replace(parts[section], info["path"])
+        info.update(
+            uri=f"file://{info['path']}",
+            bytes=os.path.getsize(info["path"]),
+            columns=writer.columns,
+            units=metadata.get(f"{section}_units", {}),
+        )
+    summary = {key: value for key, value in metadata.items() if not key.endswith("_units")}
+    summary.update(format=file_format, chunks=len(chunks), files=files)
+    return summary
+
+
+# 12) Ensemble statistics across members, per timestep
+# The ensemble API returns each member as its own column (temperature_2m for
+# the control run, then temperature_2m_member01, ...). get_ensemble_forecast
+# reduces them to mean, spread, extremes, percentiles and the probability of
+# crossing user thresholds. With numpy (the "ensemble" extra) that is one
+# vectorised pass over a members x timesteps array; without it, a pure-Python
+# fallback computes the same numbers.
+ENSEMBLE_THRESHOLD_OPERATORS = {">=": "ge", "<=": "le", ">": "gt", "<": "lt"}
+
+
+def _parse_percentiles(percentiles: str) -> list[float]:
+    try:
+        parsed = [float(part) for part in percentiles.split(",") if part.strip()]
+    except ValueError:
+        raise ValueError(f"percentiles must be comma-separated numbers, got {percentiles!r}") from None
+    if any(not 0 <= q <= 100 for q in parsed):
+        raise ValueError("percentiles must be between 0 and 100")
+    return parsed
+
+
+def _parse_thresholds(thresholds: str) -> list[tuple[str, str, float]]:
+    """Parse e.g. 'precipitation>10,wind_gusts_10m>=60' into (variable, operator, value)."""
+    parsed = []
+    for item in (part.strip() for part in thresholds.split(",")):
+        if not item:
+            continue
+        for op in ENSEMBLE_THRESHOLD_OPERATORS:  # two-character operators are tried first
+            variable, found, value = item.partition(op)
+            if found:
+                break
+        else:
+            raise ValueError(f"Invalid threshold {item!r}; expected e.g. 'precipitation>10'")
+        try:
+            parsed.append((variable.strip(), op, float(value)))
+        except ValueError:
+            raise ValueError(f"Invalid threshold {item!r}: {value.strip()!r} is not a number") from None
+    return parsed
+
+
+def _ensemble_members(columns: dict[str, list[Any]], variable: str) -> list[list[float | None]]:
+    prefix = f"{variable}_member"
+    return [
+        column for name, column in columns.items()
+        if name == variable or (name.startswith(prefix) and name[len(prefix):].isdigit())
+    ]
+
+
+def _ensemble_stats(members: list[list[float | None]], percentiles: list[float],
+                    thresholds: list[tuple[str, float]]) -> dict[str, list[float | None]]:
+    """Per-timestep statistics over the member series; missing values are ignored."""
+    try:
+        import numpy as np
+    except ImportError:
+        return _ensemble_stats_python(members, percentiles, thresholds)
+    import warnings
+
+    values = np.array(members, dtype=float)  # members x timesteps, None becomes NaN
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN timesteps yield NaN, reported as None
+        # One sort along the member axis (NaNs last) serves min, max and every percentile;
+        # np.nanpercentile would loop over the timesteps in Python
+        ordered = np.sort(values, axis=0)
+        last = np.maximum(count - 1, 0)
+        stats = {
+            "mean": np.nanmean(values, axis=0),
+            "spread": np.nanstd(values, axis=0),
+            "min": ordered[0],
+            "max": np.take_along_axis(ordered, last[None], axis=0)[0],
+        }
+        for q in percentiles:
+            position = q / 100 * last
+            lo = np.floor(position).astype(int)
+            low = np.take_along_axis(ordered, lo[None], axis=0)[0]
+            high = np.take_along_axis(ordered, np.minimum(lo + 1, last)[None], axis=0)[0]
+            stats[f"p{q:g}"] = np.where(count > 0, low + (high - low) * (position - lo), np.nan)
+        for op, limit in thresholds:
+            hits = (getattr(operator, ENSEMBLE_THRESHOLD_OPERATORS[op])(values, limit) & valid).sum(axis=0)
+            stats[_threshold_name(op, limit)] = np.where(count > 0, 100 * hits / count, np.nan)
+    return {name: [None if x != x else x for x in np.round(row, 2).tolist()] for name, row in stats.items()}
+
+
+def _ensemble_stats_python(members: list[list[float | None]], percentiles: list[float],
+                           thresholds: list[tuple[str, float]]) -> dict[str, list[float | None]]:
+    names = ["mean", "spread", "min", "max", *(f"p{q:g}" for q in percentiles),
+             *(_threshold_name(op, limit) for op, limit in thresholds)]
+    stats: dict[str, list[float | None]] = {name: [] for name in names}
+    for step in zip(*members):
+        column = sorted(value for value in step if value is not None)
+        if not column:
+            for row in stats.values():
+                row.append(None)
+            continue
+        n = len(column)
+        mean = math.fsum(column) / n
+        row = [mean, math.sqrt(math.fsum((value - mean) ** 2 for value in column) / n), column[0], column[-1]]
+        for q in percentiles:
+            # Linear interpolation between closest ranks, as numpy.percentile does by default
+            position = q / 100 * (n - 1)
+            lo = int(position)
+            hi = min(lo + 1, n - 1)
+            row.append(column[lo] + (column[hi] - column[lo]) * (position - lo))
+        for op, limit in thresholds:
+            compare = getattr(operator, ENSEMBLE_THRESHOLD_OPERATORS[op])
+            row.append(100 * sum(1 for value in column if compare(value, limit)) / n)
+        for name, value in zip(names, row):
+            stats[name].append(round(value, 2))
+    return stats
+
+
+def _threshold_name(op: str, limit: float) -> str:
+    return f"prob_{ENSEMBLE_THRESHOLD_OPERATORS[op]}_{limit:g}"
+
+
+def _summarise_ensemble(data: dict[str, Any], variables: list[str], percentiles: list[float],
+                        thresholds: list[tuple[str, str, float]]) -> dict[str, Any]:
+    columns = data.get("hourly", {})
+    units = data.get("hourly_units", {})
+    summary = {key: value for key, value in data.items() if key not in ("hourly", "hourly_units")}
+    hourly: dict[str, list[Any]] = {"time": columns.get("time", [])}
+    hourly_units = {"time": units.get("time", "iso8601")}
+    members, missing = {}, []
+    for variable in variables:
+        series = _ensemble_members(columns, variable)
+        if not series:
+            missing.append(variable)
+            continue
+        members[variable] = len(series)
+        limits = [(op, limit) for name, op, limit in thresholds if name == variable]
+        for stat, row in _ensemble_stats(series, percentiles, limits).items():
+            hourly[f"{variable}_{stat}"] = row
+            hourly_units[f"{variable}_{stat}"] = "%" if stat.startswith("prob_") else units.get(variable, "")
+    summary.update(members=members, hourly_units=hourly_units, hourly=hourly)
+    if missing:
+        summary["missing_variables"] = missing
+    return summary
+
+
+# 13) Request validation against the local catalog (open_meteo_catalog.py)
+# Tools check variable names, models and dates before anything is fetched, so a
+# typo is answered in microseconds with suggestions rather than after an
+# upstream round trip. OPEN_METEO_CATALOG_VALIDATION=0 passes requests through
+# unchecked, e.g. for a variable Open-Meteo added after the catalog was updated.
+CATALOG_VALIDATION = os.environ.get("OPEN_METEO_CATALOG_VALIDATION", "1") != "0"
+
+
+def _validate_request(endpoint: str, **fields: Any) -> None:
+    if CATALOG_VALIDATION:
+        catalog.validate(endpoint, **fields)
+
+
+# 14) Admission control for streamable-http
+# In stateless HTTP mode a tool call holds its POST open until the result is
+# sent, so every accepted call pins sockets and buffers. AdmissionControl peeks
+# at each POST to the MCP endpoint and gives every tool a bounded number of
+# concurrent calls. Waiting calls are served round-robin across clients, so one
+# busy client cannot starve the rest, and a client (its address, or its
+# X-Client-Id header behind OPEN_METEO_TRUST_CLIENT_ID) may only have so many
+# calls running or queued. Calls are shed with
+# a JSON-RPC error, 503 (429 over the client quota) and Retry-After when the
+# queue is full or their deadline passes before a slot frees up. Deadlines come
+# from X-Request-Deadline (Unix time) or X-Request-Timeout (seconds), capped by
+# OPEN_METEO_QUEUE_TIMEOUT. Limits apply per worker process.
+ADMISSION_CONTROL = os.environ.get("OPEN_METEO_ADMISSION_CONTROL", "1") != "0"
+TOOL_CONCURRENCY = int(os.environ.get("OPEN_METEO_TOOL_CONCURRENCY", "16"))
+TOOL_CONCURRENCY_LIMITS = {"export_historical_weather": 2} | {
+    name.strip(): int(limit) for name, _, limit in (
+        entry.partition("=") for entry in os.environ.get("OPEN_METEO_TOOL_CONCURRENCY_LIMITS", "").split(",") if entry
+    )
+}
+TOOL_QUEUE_MAX = int(os.environ.get("OPEN_METEO_TOOL_QUEUE_MAX", "64"))
+CLIENT_MAX_PENDING = int(os.environ.get("OPEN_METEO_CLIENT_MAX_PENDING", "16"))
+QUEUE_TIMEOUT = float(os.environ.get("OPEN_METEO_QUEUE_TIMEOUT", "10"))
+# Only set this when every caller goes through something that controls the
+# header, e.g. a trusted proxy or the benchmark; anyone else could pick a fresh
+# id per call and sidestep the per-client quota.
+TRUST_CLIENT_ID = os.environ.get("OPEN_METEO_TRUST_CLIENT_ID", "0") != "0"
+
+
+class _ToolGate:
+    """Concurrency slots for one tool; waiters are served round-robin per client."""
+
+    def __init__(self, tool: str, limit: int) -> None:
+        self.tool = tool
+        self.limit = limit
+        self.active = 0
+        self.queued = 0
+        self.waiters: OrderedDict[str, deque[asyncio.Future[None]]] = OrderedDict()
+        self.service_time = 1.0  # moving average of call duration, for Retry-After
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.service_time * (self.queued + 1) / self.limit))
+
+    def _set_depth(self, change: int) -> None:
+        self.queued += change
+        ADMISSION_QUEUE_DEPTH.set((self.tool,), self.queued)
+
+    async def acquire(self, client: str, timeout: float) -> bool:
+        """Take a slot, waiting up to timeout seconds; False if none freed up in time."""
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return True
+        if timeout <= 0:
+            return False
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(client, deque()).append(future)
+        self._set_depth(1)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the wait ended: pass it on
+                self.release()
+            else:
+                queue = self.waiters.get(client)
+                if queue is not None and future in queue:
+                    queue.remove(future)
+                    self._set_depth(-1)
+                    if not queue:
+                        del self.waiters[client]
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            return False
+
+    def release(self, elapsed: float | None = None) -> None:
+        """Hand the slot to the next client in turn, or free it."""
+        if elapsed is not None:
+            self.service_time += 0.2 * (elapsed - self.service_time)
+        while self.waiters:
+            client, queue = next(iter(self.waiters.items()))
+            future = queue.popleft()
+            self._set_depth(-1)
+            if queue:
+                self.waiters.move_to_end(client)
+            else:
+                del self.waiters[client]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+def _tool_call(body: bytes) -> tuple[Any, str] | None:
+    """The JSON-RPC id and tool name of a tools/call request body; a batch is gated by its first call."""
+    if b'"tools/call"' not in body:
+        return None
+    try:
+        message = json.loads(body)
+    except ValueError:
+        return None
+    for item in message if isinstance(message, list) else [message]:
+        if isinstance(item, dict) and item.get("method") == "tools/call" and isinstance(item.get("params"), dict):
+            return (None if isinstance(message, list) else item.get("id")), str(item["params"].get("name", ""))
+    return None
+
+
+def _deadline(headers: Headers) -> float | None:
+    """Unix time by which the caller needs the response, if it said."""
+    try:
+        if "x-request-deadline" in headers:
+            return float(headers["x-request-deadline"])
+        if "x-request-timeout" in headers:
+            return time.time() + float(headers["x-request-timeout"])
+    except ValueError:
+        pass
+    return None
+
+
+class AdmissionControl:
+    """ASGI middleware that queues or sheds tools/call requests to the MCP endpoint."""
+
+    def __init__(self, app: ASGIApp, path: str) -> None:
+        self.app = app
+        self.path = path.rstrip("/")
+        self.gates: dict[str, _ToolGate] = {}
+        self.pending: Counter[str] = Counter()
+
+    def _gate(self, tool: str) -> _ToolGate | None:
+        gate = self.gates.get(tool)
+        # Unknown tools fail fast in FastMCP and must not grow the gate table
+        if gate is None and mcp._tool_manager.get_tool(tool) is not None:
+            gate = self.gates[tool] = _ToolGate(tool, TOOL_CONCURRENCY_LIMITS.get(tool, TOOL_CONCURRENCY))
+        return gate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (not ADMISSION_CONTROL or scope["type"] != "http" or scope["method"] != "POST"
+                or scope["path"].rstrip("/") != self.path):
+            return await self.app(scope, receive, send)
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        replayed = False
+
+        async def replay() -> Message:
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        call = _tool_call(body)
+        gate = self._gate(call[1]) if call else None
+        if gate is None:
+            return await self.app(scope, replay, send)
+
+        message_id, tool = call
+        headers = Headers(scope=scope)
+        client = (scope.get("client") or ("unknown",))[0]
+        if TRUST_CLIENT_ID:
+            client = headers.get("x-client-id") or client
+        deadline = _deadline(headers)
+        timeout = QUEUE_TIMEOUT if deadline is None else min(QUEUE_TIMEOUT, deadline - time.time())
+        if timeout <= 0:
+            return await self._shed(scope, receive, send, gate, message_id, 503, "deadline")
+        if self.pending[client] >= CLIENT_MAX_PENDING:
+            return await self._shed(scope, receive, send, gate, message_id, 429, "client_quota")
+        if gate.active >= gate.limit and gate.queued >= TOOL_QUEUE_MAX:
+            return await self._shed(scope, receive, send, gate, message_id, 503, "queue_full")
+
+        self.pending[client] += 1
+        try:
+            waited = time.perf_counter()
+            if not await gate.acquire(client, timeout):
+                reason = "deadline" if deadline is not None and time.time() >= deadline else "queue_timeout"
+                return await self._shed(scope, receive, send, gate, message_id, 503, reason)
+            started = time.perf_counter()
+            ADMISSION_WAIT.observe((tool,), started - waited)
+            try:
+                await self.app(scope, replay, send)
+            finally:
+                gate.release(time.perf_counter() - started)
+        finally:
+            self.pending[client] -= 1
+            if not self.pending[client]:
+                del self.pending[client]
+
+    async def _shed(self, scope: Scope, receive: Receive, send: Send, gate: _ToolGate, message_id: Any,
+                    status: int, reason: str) -> None:
+        ADMISSION_SHED.inc((gate.tool, reason))
+        retry_after = gate.retry_after()
+        error = {"code": -32000, "message": f"Server overloaded ({reason}), retry after {retry_after}s",
+                 "data": {"reason": reason, "retry_after": retry_after}}
+        response = JSONResponse({"jsonrpc": "2.0", "id": message_id, "error": error}, status_code=status,
+                                headers={"Retry-After": str(retry_after)})
+        await response(scope, receive, send)
+
 
 @mcp.custom_route("/health", methods=["GET"])
 async def health_check(request: Request) -> PlainTextResponse:
     return PlainTextResponse("OK")
 
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+ADMIN_LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def _admin_denied(request: Request) -> Response | None:
+    """Require the bearer token when OPEN_METEO_ADMIN_TOKEN is set, and a loopback client otherwise."""
+    if ADMIN_TOKEN:
+        if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {ADMIN_TOKEN}"):
+            return PlainTextResponse("Unauthorized", status_code=401)
+        return None
+    if request.client is None or request.client.host not in ADMIN_LOOPBACK_HOSTS:
+        return PlainTextResponse("Set OPEN_METEO_ADMIN_TOKEN to use /admin routes from other hosts", status_code=403)
+    return None
+
+@mcp.custom_route("/admin/traces", methods=["GET"])
+async def admin_traces(request: Request) -> Response:
+    """Return spans held by the in-memory exporter, newest last."""
+    if denied := _admin_denied(request):
+        return denied
+    if tracing.span_ring_buffer is None:
+        return PlainTextResponse("Enable the 'memory' trace exporter to collect spans", status_code=404)
+    try:
+        limit = int(request.query_params.get("limit", "200"))
+    except ValueError:
+        return PlainTextResponse("limit must be an integer", status_code=400)
+    spans = list(tracing.span_ring_buffer.spans)[-limit:]
+    return JSONResponse([s.to_dict() for s in spans])
+
+@mcp.custom_route("/admin/profiler", methods=["GET", "POST"])
+async def admin_profiler(request: Request) -> Response:
+    """Start or stop the sampling profiler; GET returns the collapsed stacks so far.
+
+    POST /admin/profiler?action=start&interval_ms=5 samples the event loop thread,
+    POST /admin/profiler?action=stop stops sampling and returns the profile.
+    """
+    if denied := _admin_denied(request):
+        return denied
+    if request.method == "POST":
+        action = request.query_params.get("action", "")
+        if action == "start":
+            try:
+                interval_ms = float(request.query_params.get("interval_ms", "5"))
+            except ValueError:
+                interval_ms = math.nan
+            # A zero interval would spin the sampler thread and starve the event loop of the GIL
+            if not interval_ms >= 1:
+                return PlainTextResponse("interval_ms must be a number of at least 1", status_code=400)
+            tracing.profiler.start(interval_ms / 1000, threading.get_ident())
+            return PlainTextResponse(f"profiler started ({interval_ms} ms interval)")
+        if action == "stop":
+            tracing.profiler.stop()
+        else:
+            return PlainTextResponse("action must be 'start' or 'stop'", status_code=400)
+    return PlainTextResponse(tracing.profiler.collapsed())
+
+def http_app() -> Starlette:
+    """Build the streamable-http ASGI app; uvicorn calls this in each worker process."""
+    return mcp.streamable_http_app()
+
 # Prompts for common weather queries
 @mcp.prompt()
 async def current_weather(location: str) -> str:
@@ -47,7 +1566,7 @@ async def severe_weather_check(location: str) -> str:
     Args:
         location: City name or coordinates
     """
-    return f"Check {location} for any severe weather warnings or extreme conditions in the next 48 hours. Look for high winds, heavy precipitation, or extreme temperatures using wind_gusts_10m, precipitation_probability, and temperature extremes."
+    return f"Check {location} for any severe weather warnings or extreme conditions in the next 48 hours. Look for high winds, heavy precipitation, or extreme temperatures using wind_gusts_10m, precipitation_probability, and temperature extremes. Use get_ensemble_forecast with thresholds (e.g., 'wind_gusts_10m>=75,precipitation>10') to estimate how likely each extreme is."
 
 @mcp.prompt()
 async def compare_models(location: str, variable: str) -> str:
@@ -112,6 +1631,7 @@ async def climate_analysis(location: str, start_year: int, end_year: int, month:
     return f"Analyze the climate patterns for {location} during month {month} from {start_year} to {end_year}. Use get_historical_weather to retrieve temperature_2m and precipitation data. Show trends and averages across the years."
 
 @mcp.tool()
+@_instrumented
 async def get_forecast(
     latitude: float,
     longitude: float,
@@ -126,6 +1646,7 @@ async def get_forecast(
         hourly: Comma-separated list of hourly variables (e.g., 'temperature_2m,precipitation').
         models: Comma-separated list of models to use for the forecast.
     """
+    _validate_request("forecast", hourly=hourly, models=models)
     params = {
         "latitude": latitude,
         "longitude": longitude,
@@ -135,19 +1656,72 @@ async def get_forecast(
     if models:
         params["models"] = models
         
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(OPEN_METEO_API_BASE, params=params)
-        resp.raise_for_status()
-        return resp.json()  # returns raw JSON for client consumption
+    return await _fetch_result(OPEN_METEO_API_BASE, params)
 
 @mcp.tool()
+@_instrumented
+async def get_ensemble_forecast(
+    latitude: float,
+    longitude: float,
+    hourly: str = "temperature_2m,precipitation,wind_gusts_10m",
+    model: str = "ecmwf_ifs025",
+    forecast_days: int = 7,
+    percentiles: str = "10,50,90",
+    thresholds: str = "",
+    timezone: str = "GMT"
+) -> dict[str, Any]:
+    """Fetch an ensemble forecast and summarise its members per timestep.
+
+    Instead of every member series, returns for each variable the member mean,
+    spread (standard deviation), min, max and percentiles, plus the percentage
+    of members crossing each threshold, e.g. 'precipitation>10' becomes
+    'precipitation_prob_gt_10'. Useful for the risk of severe weather.
+
+    Args:
+        latitude: Latitude in decimal degrees.
+        longitude: Longitude in decimal degrees.
+        hourly: Comma-separated list of hourly variables (e.g., 'temperature_2m,precipitation').
+        model: Ensemble model (e.g., 'ecmwf_ifs025', 'gfs025', 'icon_seamless', 'gem_global').
+        forecast_days: Number of forecast days (1-35, default: 7).
+        percentiles: Comma-separated percentiles to compute (default: '10,50,90').
+        thresholds: Comma-separated exceedance thresholds (e.g., 'precipitation>10,wind_gusts_10m>=60,temperature_2m<0').
+        timezone: Timezone (e.g., 'GMT', 'America/New_York', default: 'GMT').
+    """
+    if "," in model:
+        raise ValueError("Request one ensemble model per call")
+    if forecast_days < 1 or forecast_days > 35:
+        raise ValueError("forecast_days must be between 1 and 35")
+    quantiles = _parse_percentiles(percentiles)
+    limits = _parse_thresholds(thresholds)
+    variables = [variable.strip() for variable in hourly.split(",") if variable.strip()]
+    # Variables that only appear in a threshold are fetched too
+    variables += [name for name, _, _ in limits if name not in variables]
+    _validate_request("ensemble", hourly=variables, models=model)
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "hourly": ",".join(variables),
+        "models": model,
+        "forecast_days": forecast_days,
+        "timezone": timezone
+    }
+    
+    data = await _fetch_json(OPEN_METEO_ENSEMBLE_API_BASE, params)
+    with span("ensemble.stats"):
+        summary = await asyncio.to_thread(_summarise_ensemble, data, variables, quantiles, limits)
+    summary["model"] = model
+    return summary
+
+@mcp.tool()
+@_instrumented
 async def get_historical_forecast(
     latitude: float,
     longitude: float,
     start_date: str,
     end_date: str,
     hourly: str = "temperature_2m",
-    models: str = "gfs_seamless"
+    models: str = "gfs_seamless",
+    partial_results: bool = False
 ) -> dict[str, Any]:
     """Fetch historical hourly forecast for a location.
 
@@ -158,7 +1732,9 @@ async def get_historical_forecast(
         end_date: End date in YYYY-MM-DD format.
         hourly: Comma-separated list of hourly variables (e.g., 'temperature_2m,precipitation').
         models: Comma-separated list of models to use for the forecast.
+        partial_results: Also send each year of a long range as a log notification as soon as it arrives.
     """
+    _validate_request("historical_forecast", hourly=hourly, models=models, start_date=start_date, end_date=end_date)
     params = {
         "latitude": latitude,
         "longitude": longitude,
@@ -169,12 +1745,11 @@ async def get_historical_forecast(
     if models:
         params["models"] = models
     
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(OPEN_METEO_HISTORICAL_API_BASE, params=params)
-        resp.raise_for_status()
-        return resp.json()  # returns raw JSON for client consumption
+    chunks = _plan_chunks(params, [hourly.split(",")])
+    return await _fetch_result(OPEN_METEO_HISTORICAL_API_BASE, params, chunks, partial_results)
 
 @mcp.tool()
+@_instrumented
 async def get_previous_model_runs(
     latitude: float,
     longitude: float,
@@ -183,7 +1758,8 @@ async def get_previous_model_runs(
     hourly: str = "temperature_2m",
     models: str = "ecmwf_ifs025,gem_seamless,icon_seamless",  # ✅ Better models
     previous_days: int = 5,
-    timezone: str = "MST"# ✅ User-controlled
+    timezone: str = "MST",# ✅ User-controlled
+    partial_results: bool = False
 ) -> dict[str, Any]:
     """Fetch previous model runs for a location.
 
@@ -194,27 +1770,32 @@ async def get_previous_model_runs(
         end_date: End date in YYYY-MM-DD format.
         hourly: Comma-separated list of hourly variables (e.g., 'temperature_2m,precipitation').
         models: Comma-separated list of models to use for the forecast.
-        previous_days: Number of previous days to retrieve (1-7, default: 5).
+        previous_days: Number of earlier runs to add per variable as _previous_day1.._previous_dayN (1-7, default: 5).
         timezone: Timezone (e.g., 'GMT', 'America/New_York', default: 'GMT'). 
+        partial_results: Also send each chunk (per year or variable) of a large pull as a log notification as soon as it arrives.
     """
     
     # Validate previous_days parameter
-    if previous_days < 1 or previous_days > 7:
-        raise ValueError("previous_days must be between 1 and 7")
+    if previous_days < 1 or previous_days > catalog.MAX_PREVIOUS_DAYS:
+        raise ValueError(f"previous_days must be between 1 and {catalog.MAX_PREVIOUS_DAYS}")
+    _validate_request("previous_runs", hourly=hourly, models=models, start_date=start_date, end_date=end_date)
     
     # Parse the hourly parameters to automatically add previous day variants
-    hourly_params = []
-    base_params = [param.strip() for param in hourly.split(',')]
-    
-    for param in base_params:
-        # Add the base parameter
-        hourly_params.append(param)
+    with span("params.expand"):
+        hourly_params = []
+        groups = []
+        base_params = [param.strip() for param in hourly.split(',')]
         
-        # For temperature and precipitation, automatically add previous day variants
-        # But only if they're not already included in the hourly string
-        if param in ["temperature_2m", "precipitation"] and not any(f"{param}_previous_day" in h for h in base_params):
-            for day in range(1, previous_days + 1):
-                hourly_params.append(f"{param}_previous_day{day}")
+        for param in base_params:
+            # Add the base parameter
+            group = [param]
+            
+            # Add previous day variants for every variable the catalog has earlier runs of,
+            # but only if they're not already included in the hourly string
+            if not any(f"{param}_previous_day" in h for h in base_params):
+                group.extend(catalog.previous_day_variants("previous_runs", param, previous_days))
+            groups.append(group)
+            hourly_params.extend(group)
     
     # Build parameters for the API call
     params = {
@@ -230,12 +1811,11 @@ async def get_previous_model_runs(
     if models:
         params["models"] = models
     
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(OPEN_METEO_PREVIOUS_RUNS_API_BASE, params=params)
-        resp.raise_for_status()
-        return resp.json()
+    chunks = _plan_chunks(params, groups)
+    return await _fetch_result(OPEN_METEO_PREVIOUS_RUNS_API_BASE, params, chunks, partial_results)
 
 @mcp.tool()
+@_instrumented
 async def get_historical_weather(
     latitude: float,
     longitude: float,
@@ -246,7 +1826,8 @@ async def get_historical_weather(
     temperature_unit: str = "celsius",
     wind_speed_unit: str = "kmh",
     precipitation_unit: str = "mm",
-    timezone: str = "GMT"
+    timezone: str = "GMT",
+    partial_results: bool = False
 ) -> dict[str, Any]:
     """Fetch historical weather data (reanalysis) for a location from 1940 onwards.
     
@@ -264,7 +1845,9 @@ async def get_historical_weather(
         wind_speed_unit: Wind speed unit ('kmh', 'ms', 'mph', or 'kn', default: 'kmh').
         precipitation_unit: Precipitation unit ('mm' or 'inch', default: 'mm').
         timezone: Timezone (e.g., 'GMT', 'America/New_York', default: 'GMT').
+        partial_results: Also send each year of a long range as a log notification as soon as it arrives.
     """
+    _validate_request("archive", hourly=hourly, daily=daily, start_date=start_date, end_date=end_date)
     params = {
         "latitude": latitude,
         "longitude": longitude,
@@ -282,11 +1865,151 @@ async def get_historical_weather(
     if daily:
         params["daily"] = daily
     
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(OPEN_METEO_ARCHIVE_API_BASE, params=params)
-        resp.raise_for_status()
-        return resp.json()
+    chunks = _plan_chunks(params, [hourly.split(",")] if hourly else [], len(daily.split(",")) if daily else 0)
+    return await _fetch_result(OPEN_METEO_ARCHIVE_API_BASE, params, chunks, partial_results)
+
+@mcp.tool()
+@_instrumented
+async def export_historical_weather(
+    latitude: float,
+    longitude: float,
+    start_date: str,
+    end_date: str,
+    hourly: str = "",
+    daily: str = "",
+    file_format: str = "parquet",
+    temperature_unit: str = "celsius",
+    wind_speed_unit: str = "kmh",
+    precipitation_unit: str = "mm",
+    timezone: str = "GMT"
+) -> dict[str, Any]:
+    """Write historical weather data (reanalysis) for a location to local files.
+
+    For bulk extraction: the data is streamed to one file per section (hourly,
+    daily) on the server's disk instead of being returned, and the paths are
+    returned with row counts, columns, units and time span.
+
+    Args:
+        latitude: Latitude in decimal degrees.
+        longitude: Longitude in decimal degrees.
+        start_date: Start date in YYYY-MM-DD format.
+        end_date: End date in YYYY-MM-DD format.
+        hourly: Comma-separated list of hourly variables (e.g., 'temperature_2m,precipitation').
+        daily: Comma-separated list of daily aggregated variables (e.g., 'temperature_2m_max,precipitation_sum').
+        file_format: 'parquet', 'arrow' (Arrow IPC) or 'csv' (default: 'parquet'; CSV if pyarrow is unavailable).
+        temperature_unit: Temperature unit ('celsius' or 'fahrenheit', default: 'celsius').
+        wind_speed_unit: Wind speed unit ('kmh', 'ms', 'mph', or 'kn', default: 'kmh').
+        precipitation_unit: Precipitation unit ('mm' or 'inch', default: 'mm').
+        timezone: Timezone (e.g., 'GMT', 'America/New_York', default: 'GMT').
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"file_format must be one of {', '.join(EXPORT_FORMATS)}")
+    if not hourly and not daily:
+        raise ValueError("Request at least one hourly or daily variable")
+    _validate_request("archive", hourly=hourly, daily=daily, start_date=start_date, end_date=end_date)
+    note = None
+    if file_format != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            file_format, note = "csv", f"pyarrow is not installed, so CSV was written instead of {file_format}"
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "start_date": start_date,
+        "end_date": end_date,
+        "temperature_unit": temperature_unit,
+        "wind_speed_unit": wind_speed_unit,
+        "precipitation_unit": precipitation_unit,
+        "timezone": timezone
+    }
+    if hourly:
+        params["hourly"] = hourly
+    if daily:
+        params["daily"] = daily
+    
+    chunks = _plan_chunks(params, [hourly.split(",")] if hourly else [], len(daily.split(",")) if daily else 0)
+    summary = await _export_chunks(OPEN_METEO_ARCHIVE_API_BASE, params, chunks, file_format)
+    if note:
+        summary["note"] = note
+    return summary
+
+@mcp.tool()
+@_instrumented
+async def read_result(
+    result_id: str,
+    section: str = "hourly",
+    variables: str = "all",
+    start: str = "",
+    end: str = "",
+    page: int = 0
+) -> dict[str, Any]:
+    """Read part of a large result that another tool returned as a resource handle.
+
+    Give start and/or end to select a time window, otherwise rows are returned in
+    pages of a fixed size; follow 'next' for the following page.
+
+    Args:
+        result_id: The 'id' from the result handle.
+        section: Time-series section to read ('hourly', 'daily' or 'minutely_15').
+        variables: Comma-separated variables to include, or 'all'.
+        start: First timestamp or date to include (e.g., '2020-06-01' or '2020-06-01T12:00').
+        end: Last timestamp or date to include; a date includes the whole day.
+        page: Page number when no time window is given (default: 0).
+    """
+    data = await _load_result(result_id)
+    with span("result.slice"):
+        windowed = bool(start or end)
+        return _result_page(result_id, data, section, variables, start, end, None if windowed else page)
+
+@mcp.resource(RESULT_URI, mime_type="application/json")
+async def result_summary(result_id: str) -> str:
+    """Metadata and paging information for a stored result."""
+    data = await _load_result(result_id)
+    return json.dumps(_result_summary(result_id, data, result_store.expires_in(result_id)))
+
+@mcp.resource(RESULT_URI + "/{section}/page/{page}", mime_type="application/json")
+async def result_page(result_id: str, section: str, page: str) -> str:
+    """One page of rows, all variables, of a stored result."""
+    data = await _load_result(result_id)
+    return json.dumps(_result_page(result_id, data, section, page=int(page)))
+
+@mcp.resource(RESULT_URI + "/{section}/{variables}/{start}/{end}", mime_type="application/json")
+async def result_window(result_id: str, section: str, variables: str, start: str, end: str) -> str:
+    """A time window of selected variables ('all' for every one) of a stored result."""
+    data = await _load_result(result_id)
+    return json.dumps(_result_page(result_id, data, section, variables, start, end))
+
+@mcp.resource("open-meteo://catalog", mime_type="application/json")
+async def variable_catalog() -> str:
+    """Variables, models and date range of every tool's Open-Meteo API."""
+    return json.dumps(catalog.describe())
 
 if __name__ == "__main__":
-    # Run over stdio by default; clients can connect via CLI or any MCP transport
-    mcp.run(transport="stdio")
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Open-Meteo MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http"], default="stdio")
+    parser.add_argument("--host", default=mcp.settings.host)
+    parser.add_argument("--port", type=int, default=mcp.settings.port)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for streamable-http; they share one response cache")
+    args = parser.parse_args()
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+
+    if args.workers > 1:
+        if args.transport != "streamable-http":
+            parser.error("--workers requires --transport streamable-http")
+        import tempfile
+        import uvicorn
+
+        # Workers import this module afresh and pick these up from the environment
+        os.environ.setdefault("OPEN_METEO_CACHE_PATH",
+                              os.path.join(tempfile.gettempdir(), f"open-meteo-cache-{args.port}.sqlite3"))
+        os.environ.setdefault("OPEN_METEO_METRICS_DIR", tempfile.mkdtemp(prefix="open-meteo-metrics-"))
+        uvicorn.run("open_meteo_server:http_app", factory=True, host=args.host, port=args.port,
+                    workers=args.workers, log_level=mcp.settings.log_level.lower())
+    else:
+        # Run over stdio by default; clients can connect via CLI or any MCP transport
+        mcp.run(transport=args.transport)
@@ -0,0 +1,212 @@
+"""Fast-starting stdio entry point for the Open-Meteo MCP server.
+
+Claude Desktop spawns a fresh stdio server for every session, and importing
+the MCP SDK (pydantic models, starlette, uvicorn, httpx) takes far longer than
+the handshake itself. This launcher uses only the standard library: it
+answers ``initialize``, ``ping`` and the ``*/list`` requests from a manifest
+cached from a previous run, while ``open_meteo_server`` is imported on a
+background thread. The first request that needs the real server (a tool
+call, ``prompts/get``, ...) waits for that import and then hands the rest of
+the session to FastMCP, which continues it as an already-initialized session.
+
+The manifest lives in ``$OPEN_METEO_MANIFEST_DIR`` (default
+``~/.cache/open-meteo-mcp``) and is keyed by a hash of open_meteo_server.py
+and the installed mcp, fastmcp and pydantic versions, so editing the server or
+upgrading the SDK invalidates it. Without a manifest the launcher simply
+hands off on the first message.
+
+    python open_meteo_stdio.py
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import os
+import sys
+import threading
+
+SERVER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "open_meteo_server.py")
+MANIFEST_DIR = os.environ.get(
+    "OPEN_METEO_MANIFEST_DIR",
+    os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "open-meteo-mcp"),
+)
+
+# Packages whose version changes the handshake or the tool schemas
+MANIFEST_PACKAGES = ("mcp", "fastmcp", "pydantic")
+
+# Requests answered from the manifest, mapped to the manifest key holding the result
+LIST_METHODS = {
+    "tools/list": "tools",
+    "prompts/list": "prompts",
+    "resources/list": "resources",
+    "resources/templates/list": "resource_templates",
+}
+
+
+def package_version(name: str) -> str:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return ""
+
+
+def manifest_path() -> str:
+    digest = hashlib.sha256(sys.version.encode())
+    with open(SERVER_SOURCE, "rb") as source:
+        digest.update(source.read())
+    for name in MANIFEST_PACKAGES:
+        digest.update(f"\0{name}=={package_version(name)}".encode())
+    return os.path.join(MANIFEST_DIR, f"manifest-{digest.hexdigest()[:16]}.json")
+
+
+def load_manifest(path: str) -> dict | None:
+    try:
+        with open(path) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return None
+
+
+async def build_manifest(server) -> dict:
+    """Capture everything the launcher needs to answer the handshake and list requests."""
+    from mcp import types
+    from mcp.shared.version import SUPPORTED_PROTOCOL_VERSIONS
+
+    lowlevel = server.mcp._mcp_server
+    options = lowlevel.create_initialization_options()
+
+    def dump(items) -> list[dict]:
+        return [item.model_dump(mode="json", by_alias=True, exclude_none=True) for item in items]
+
+    return {
+        "protocol_versions": list(SUPPORTED_PROTOCOL_VERSIONS),
+        "latest_protocol_version": types.LATEST_PROTOCOL_VERSION,
+        "initialize": {
+            "capabilities": options.capabilities.model_dump(mode="json", by_alias=True, exclude_none=True),
+            "serverInfo": {"name": options.server_name, "version": options.server_version},
+            **({"instructions": options.instructions} if options.instructions else {}),
+        },
+        "tools": {"tools": dump(await server.mcp.list_tools())},
+        "prompts": {"prompts": dump(await server.mcp.list_prompts())},
+        "resources": {"resources": dump(await server.mcp.list_resources())},
+        "resource_templates": {"resourceTemplates": dump(await server.mcp.list_resource_templates())},
+    }
+
+
+def write_manifest(path: str, manifest: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as out:
+        json.dump(manifest, out)
+    os.replace(path + ".tmp", path)
+
+
+class ServerLoader(threading.Thread):
+    """Imports open_meteo_server in the background and refreshes a missing manifest."""
+
+    def __init__(self, manifest_file: str, refresh_manifest: bool) -> None:
+        super().__init__(name="open-meteo-loader", daemon=True)
+        self.manifest_file = manifest_file
+        self.refresh_manifest = refresh_manifest
+        self.server = None
+        self.error: BaseException | None = None
+
+    def run(self) -> None:
+        # Let the main thread preempt the import promptly to answer from the manifest
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(0.0005)
+        try:
+            import open_meteo_server
+
+            self.server = open_meteo_server
+            if self.refresh_manifest:
+                import asyncio
+
+                write_manifest(self.manifest_file, asyncio.run(build_manifest(open_meteo_server)))
+        except BaseException as exc:  # surfaced by the main thread at hand-off
+            self.error = exc
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+
+def respond(message_id, result: dict) -> None:
+    sys.stdout.buffer.write(json.dumps({"jsonrpc": "2.0", "id": message_id, "result": result}).encode() + b"\n")
+    sys.stdout.buffer.flush()
+
+
+def answer(message: dict, manifest: dict) -> bool:
+    """Answer a message from the manifest; False means the real server is needed."""
+    method = message.get("method")
+    if "id" not in message:
+        # Notifications (initialized, cancelled for nothing in flight) need no reply
+        return method is not None and method.startswith("notifications/")
+    if method == "initialize":
+        requested = message.get("params", {}).get("protocolVersion")
+        version = requested if requested in manifest["protocol_versions"] else manifest["latest_protocol_version"]
+        respond(message["id"], {"protocolVersion": version, **manifest["initialize"]})
+        return True
+    if method == "ping":
+        respond(message["id"], {})
+        return True
+    if method in LIST_METHODS:
+        respond(message["id"], manifest[LIST_METHODS[method]])
+        return True
+    return False
+
+
+async def serve(server, pending: list[bytes]) -> None:
+    """Run FastMCP over stdio, replaying the messages read before the hand-off."""
+    import anyio
+    from mcp import types
+    from mcp.server.stdio import stdio_server
+    from mcp.shared.message import SessionMessage
+
+    lowlevel = server.mcp._mcp_server
+    async with stdio_server() as (stdin_stream, stdout_stream):
+        send, receive = anyio.create_memory_object_stream(0)
+
+        async def forward() -> None:
+            async with send:
+                for line in pending:
+                    await send.send(SessionMessage(types.JSONRPCMessage.model_validate_json(line)))
+                async for message in stdin_stream:
+                    await send.send(message)
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(forward)
+            # The handshake may already have been answered here, so the session starts
+            # initialized; an initialize request that reaches it is still answered
+            await lowlevel.run(receive, stdout_stream, lowlevel.create_initialization_options(), stateless=True)
+            tg.cancel_scope.cancel()
+
+
+def main() -> None:
+    manifest_file = manifest_path()
+    manifest = load_manifest(manifest_file)
+    loader = ServerLoader(manifest_file, refresh_manifest=manifest is None)
+    loader.start()
+
+    pending: list[bytes] = []
+    for line in iter(sys.stdin.buffer.readline, b""):
+        if not line.strip():
+            continue
+        try:
+            message = json.loads(line)
+        except ValueError:
+            message = None
+        if manifest is not None and isinstance(message, dict) and answer(message, manifest):
+            continue
+        pending.append(line)
+        break
+    else:
+        return  # client went away before needing the server
+
+    loader.join()
+    if loader.error is not None:
+        raise loader.error
+    import anyio
+
+    anyio.run(serve, loader.server, pending)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Spans and a sampling profiler for the Open-Meteo MCP server.
+
+``span`` times a block as a child of the current span, which is tracked in a
+context variable so it follows tool calls across awaits. Spans are only
+recorded when at least one exporter is configured, e.g.
+``OPEN_METEO_TRACE_EXPORTERS=log,memory,otlp``; otherwise ``span`` yields a
+shared no-op stand-in and costs a context variable lookup. Root spans are
+sampled with ``OPEN_METEO_TRACE_SAMPLE_RATE`` and children follow their root's
+decision.
+
+``profiler`` samples one thread's stack on a background thread and counts
+collapsed stacks, for flamegraph.pl or speedscope. The server exposes both
+through its /admin routes.
+
+    from open_meteo_tracing import span
+
+    with span("upstream", url=url) as current:
+        current.set("http.status_code", 200)
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import httpx
+
+TRACE_SAMPLE_RATE = float(os.environ.get("OPEN_METEO_TRACE_SAMPLE_RATE", "1.0"))
+OTLP_ENDPOINT = os.environ.get("OPEN_METEO_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces")
+
+tracing_logger = logging.getLogger("open_meteo_server.tracing")
+
+
+class Span:
+    """A timed operation, linked to its parent by trace and span ids."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent: "Span | None" = None, attributes: dict[str, Any] | None = None) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.error: str | None = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class NoopSpan:
+    """Stand-in yielded when tracing is off or the trace was not sampled."""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+_current_span: contextvars.ContextVar[Span | NoopSpan | None] = contextvars.ContextVar(
+    "open_meteo_current_span", default=None
+)
+
+
+class LogSpanExporter:
+    """Writes each finished span as one log line."""
+
+    def export(self, span: Span) -> None:
+        tracing_logger.info("span %s", json.dumps(span.to_dict(), default=str))
+
+
+class RingBufferSpanExporter:
+    """Keeps the most recent spans in memory for the /admin/traces route."""
+
+    def __init__(self, maxlen: int = 2048) -> None:
+        self.spans: deque[Span] = deque(maxlen=maxlen)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+class OTLPSpanExporter:
+    """Posts finished traces to an OTLP/HTTP collector using the JSON encoding."""
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, service_name: str = "open-meteo") -> None:
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.pending: list[Span] = []
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def export(self, span: Span) -> None:
+        self.pending.append(span)
+        if span.parent_id is None:
+            batch, self.pending = self.pending, []
+            task = asyncio.get_running_loop().create_task(self._post(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def encode(self, spans: list[Span]) -> dict[str, Any]:
+        def attribute(key: str, value: Any) -> dict[str, Any]:
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        encoded = []
+        for span in spans:
+            item = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [attribute(k, v) for k, v in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            encoded.append(item)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "open_meteo_server"}, "spans": encoded}],
+            }]
+        }
+
+    async def _post(self, spans: list[Span]) -> None:
+        try:
+            async with httpx.AsyncClient() as client:
+                resp = await client.post(self.endpoint, json=self.encode(spans))
+                resp.raise_for_status()
+        except httpx.HTTPError as exc:
+            tracing_logger.warning("OTLP export to %s failed: %s", self.endpoint, exc)
+
+
+_span_exporters: list[Any] = []
+span_ring_buffer: RingBufferSpanExporter | None = None
+
+
+def add_span_exporter(exporter: Any) -> None:
+    """Register an exporter; anything with an ``export(span)`` method works."""
+    global span_ring_buffer
+    _span_exporters.append(exporter)
+    if isinstance(exporter, RingBufferSpanExporter) and span_ring_buffer is None:
+        span_ring_buffer = exporter
+
+
+def _configure_tracing() -> None:
+    factories = {"log": LogSpanExporter, "memory": RingBufferSpanExporter, "otlp": OTLPSpanExporter}
+    for name in filter(None, os.environ.get("OPEN_METEO_TRACE_EXPORTERS", "").split(",")):
+        name = name.strip()
+        if name not in factories:
+            raise ValueError(f"Unknown trace exporter '{name}', expected one of {sorted(factories)}")
+        add_span_exporter(factories[name]())
+
+
+def _finish_span(current: Span) -> None:
+    current.end_ns = time.time_ns()
+    for exporter in _span_exporters:
+        exporter.export(current)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | NoopSpan]:
+    """Time the enclosed block as a child of the current span."""
+    parent = _current_span.get()
+    if not _span_exporters or parent is NOOP_SPAN:
+        yield NOOP_SPAN
+        return
+    if parent is None and random.random() >= TRACE_SAMPLE_RATE:
+        token = _current_span.set(NOOP_SPAN)
+        try:
+            yield NOOP_SPAN
+        finally:
+            _current_span.reset(token)
+        return
+    current = Span(name, parent, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = repr(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish_span(current)
+
+
+def httpx_trace_hook(parent: Span) -> Callable[[str, dict[str, Any]], Awaitable[None]]:
+    """Turn httpcore trace events (connect_tcp, start_tls, receive_response_headers, ...) into child spans."""
+    open_spans: dict[str, Span] = {}
+
+    async def trace(event_name: str, info: dict[str, Any]) -> None:
+        phase, _, state = event_name.rpartition(".")
+        if state == "started":
+            open_spans[phase] = Span(phase, parent)
+        elif (child := open_spans.pop(phase, None)) is not None:
+            if state == "failed":
+                child.error = repr(info.get("exception"))
+            _finish_span(child)
+
+    return trace
+
+
+class SamplingProfiler:
+    """Periodically samples one thread's stack and counts collapsed stacks.
+
+    The output of ``collapsed`` is the folded format consumed by flamegraph.pl
+    and speedscope.
+    """
+
+    def __init__(self) -> None:
+        self.samples: Counter[str] = Counter()
+        self.interval = 0.005
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float, thread_id: int) -> None:
+        if self._thread is not None:
+            return
+        self.samples.clear()
+        self.interval = interval
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(thread_id,), name="open-meteo-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, thread_id: int) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+profiler = SamplingProfiler()
+_configure_tracing()
@@ -0,0 +1,176 @@
+"""Tests for the offline benchmark harness in benchmarks/."""
+
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+import bench_startup
+from bench_server import compare, percentile
+from fake_open_meteo import FakeUpstreamConfig, ReplayStore, create_app, load_capture, upstream_env
+
+
+def fake_client(config: FakeUpstreamConfig) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(config)), base_url="http://upstream")
+
+
+class TestFakeUpstream:
+    """Tests for the fake Open-Meteo service."""
+    
+    @pytest.mark.asyncio
+    async def test_archive_response_shape(self):
+        """Test that responses have Open-Meteo's column layout over the requested range."""
+        async with fake_client(FakeUpstreamConfig()) as client:
+            resp = await client.get("/archive/v1/archive", params={
+                "latitude": 52.52,
+                "longitude": 13.419,
+                "start_date": "2020-01-01",
+                "end_date": "2020-01-02",
+                "hourly": "temperature_2m,precipitation",
+                "daily": "precipitation_sum"
+            })
+        
+        data = resp.json()
+        assert resp.status_code == 200
+        assert len(data["hourly"]["time"]) == 48
+        assert data["hourly"]["time"][0] == "2020-01-01T00:00"
+        assert len(data["hourly"]["precipitation"]) == 48
+        assert data["hourly_units"]["temperature_2m"] == "°C"
+        assert data["daily"]["time"] == ["2020-01-01", "2020-01-02"]
+    
+    @pytest.mark.asyncio
+    async def test_payload_size_override(self):
+        """Test that --hours forces the number of hourly timesteps."""
+        async with fake_client(FakeUpstreamConfig(hours=5000)) as client:
+            resp = await client.get("/forecast/v1/forecast", params={
+                "latitude": 1, "longitude": 2, "hourly": "temperature_2m"
+            })
+        
+        assert len(resp.json()["hourly"]["temperature_2m"]) == 5000
+    
+    @pytest.mark.asyncio
+    async def test_error_injection(self):
+        """Test that a full error rate fails every request with the configured status."""
+        async with fake_client(FakeUpstreamConfig(error_rate=1.0, error_status=429)) as client:
+            resp = await client.get("/forecast/v1/forecast", params={"latitude": 1, "longitude": 2})
+        
+        assert resp.status_code == 429
+    
+    def test_upstream_env_covers_every_base_url(self):
+        """Test that the env helper points each server base URL at the fake."""
+        env = upstream_env("http://127.0.0.1:9000/")
+        
+        assert env["OPEN_METEO_ARCHIVE_API_BASE"] == "http://127.0.0.1:9000/archive/v1/archive"
+        assert set(env) == {
+            "OPEN_METEO_API_BASE",
+            "OPEN_METEO_HISTORICAL_API_BASE",
+            "OPEN_METEO_PREVIOUS_RUNS_API_BASE",
+            "OPEN_METEO_ARCHIVE_API_BASE",
+            "OPEN_METEO_ENSEMBLE_API_BASE"
+        }
+
+
+class TestReplay:
+    """Tests for capturing upstream traffic and replaying it."""
+    
+    @pytest.mark.asyncio
+    async def test_capture_records_tool_calls_and_upstream_exchanges(self, tmp_path, monkeypatch, sample_forecast_response):
+        """Test that a captured tool call can be read back with its upstream response."""
+        import respx
+        import open_meteo_server
+        
+        path = tmp_path / "capture.jsonl.gz"
+        recorder = open_meteo_server.TrafficRecorder(str(path))
+        monkeypatch.setattr(open_meteo_server, "traffic_recorder", recorder)
+        
+        with respx.mock:
+            respx.get(open_meteo_server.OPEN_METEO_API_BASE).respond(json=sample_forecast_response)
+            await open_meteo_server.get_forecast(latitude=52.52, longitude=13.419)
+        recorder.close()
+        
+        upstream, tool = load_capture(str(path))
+        assert upstream["type"] == "upstream"
+        assert upstream["tool"] == "get_forecast"
+        assert upstream["api"] == "OPEN_METEO_API_BASE"
+        assert upstream["params"]["latitude"] == "52.52"
+        assert upstream["status"] == 200
+        assert upstream["body"] == httpx.Response(200, json=sample_forecast_response).text
+        assert tool["type"] == "tool"
+        assert tool["arguments"] == {"latitude": 52.52, "longitude": 13.419}
+        assert tool["t"] <= upstream["t"] + 1e-3
+    
+    def test_appended_sessions_keep_their_offsets(self, tmp_path):
+        """Test that a session idle before its first call is shifted by when it started, not by that call."""
+        import time
+        import open_meteo_server
+        
+        path = str(tmp_path / "capture.jsonl.gz")
+        first = open_meteo_server.TrafficRecorder(path)
+        first.record("tool", first.started, tool="get_forecast")
+        first.close()
+        
+        second = open_meteo_server.TrafficRecorder(path)
+        time.sleep(0.3)
+        second.record("tool", time.perf_counter(), tool="get_forecast")
+        second.close()
+        
+        records = load_capture(path)
+        expected = second.started_at - first.started_at + 0.3
+        assert records[1]["t"] == pytest.approx(expected, abs=0.1)
+    
+    @pytest.mark.asyncio
+    async def test_replay_serves_recorded_responses(self):
+        """Test that recorded responses are served back and misses fall back to synthetic data."""
+        records = [{
+            "type": "upstream", "t": 0.0, "tool": "get_forecast", "api": "OPEN_METEO_API_BASE",
+            "params": {"latitude": "1.0", "longitude": "2.0"}, "status": 502,
+            "duration_ms": 10.0, "body": '{"error":true,"reason":"recorded"}'
+        }]
+        store = ReplayStore(records)
+        
+        async with fake_client(FakeUpstreamConfig(replay=store, time_scale=0.0)) as client:
+            hit = await client.get("/forecast/v1/forecast", params={"latitude": "1.0", "longitude": "2.0"})
+            miss = await client.get("/forecast/v1/forecast", params={"latitude": "3.0", "longitude": "2.0"})
+        
+        assert hit.status_code == 502
+        assert hit.json()["reason"] == "recorded"
+        assert miss.status_code == 200
+        assert miss.headers["X-Replay"] == "miss"
+        assert (store.hits, store.misses) == (1, 1)
+
+
+class TestBenchmarkReport:
+    """Tests for the report helpers."""
+    
+    def test_percentile_interpolates(self):
+        """Test linear interpolation between ranks."""
+        assert percentile([10.0, 20.0, 30.0, 40.0], 50) == 25.0
+        assert percentile([10.0, 20.0, 30.0, 40.0], 100) == 40.0
+    
+    def test_compare_flags_regressions(self):
+        """Test that throughput drops and latency growth beyond tolerance are reported."""
+        baseline = [{"transport": "stdio", "tool": "get_forecast", "throughput_rps": 100.0, "p50_ms": 10.0, "p99_ms": 20.0}]
+        current = [{"transport": "stdio", "tool": "get_forecast", "throughput_rps": 80.0, "p50_ms": 10.5, "p99_ms": 30.0}]
+        
+        regressions = compare(current, baseline, tolerance=0.1)
+        
+        assert len(regressions) == 2
+        assert "throughput" in regressions[0]
+        assert "p99_ms" in regressions[1]
+    
+    def test_startup_budget_counts_from_the_interpreter_floor(self, monkeypatch, capsys):
+        """Test that the default startup budget applies to time above bare interpreter startup."""
+        def results(launcher_ms):
+            return {
+                "python -c pass": {"interpreter": 150.0},
+                "launcher": {"initialize": launcher_ms - 20, "tools/list": launcher_ms, "prompts/get": 900.0},
+            }
+        
+        monkeypatch.setattr(bench_startup, "run", lambda args: results(230.0))
+        assert bench_startup.main(["--runs", "1"]) == 0
+        monkeypatch.setattr(bench_startup, "run", lambda args: results(260.0))
+        assert bench_startup.main(["--runs", "1"]) == 1
+        assert bench_startup.main(["--runs", "1", "--budget-ms", "0"]) == 0
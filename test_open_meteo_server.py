@@ -1,8 +1,9 @@
 """Tests for the Open-Meteo FastMCP Server."""
 
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, Mock, patch
 import json
+import os
 from datetime import datetime, timedelta
 
 # Test imports
@@ -13,10 +14,12 @@ from open_meteo_server import (
     get_previous_model_runs,
     get_historical_weather,
     health_check,
+    metrics,
     OPEN_METEO_API_BASE,
     OPEN_METEO_HISTORICAL_API_BASE,
     OPEN_METEO_PREVIOUS_RUNS_API_BASE,
-    OPEN_METEO_ARCHIVE_API_BASE
+    OPEN_METEO_ARCHIVE_API_BASE,
+    OPEN_METEO_ENSEMBLE_API_BASE
 )
 
 
@@ -35,6 +38,1076 @@ class TestHealthEndpoint:
         assert response.status_code == 200
 
 
+class TestMetricsEndpoint:
+    """Tests for the Prometheus metrics endpoint."""
+    
+    @pytest.mark.asyncio
+    async def test_metrics_record_tool_and_upstream_calls(self, sample_forecast_response):
+        """Test that a tool call shows up in tool and upstream series."""
+        import respx
+        
+        with respx.mock:
+            respx.get(OPEN_METEO_API_BASE).respond(json=sample_forecast_response)
+            await get_forecast(latitude=52.52, longitude=13.419)
+        
+        response = await metrics(AsyncMock())
+        body = response.body.decode()
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'open_meteo_tool_calls_total{tool="get_forecast",outcome="ok"}' in body
+        assert 'open_meteo_tool_duration_seconds_bucket{tool="get_forecast",le="+Inf"}' in body
+        assert f'open_meteo_upstream_requests_total{{base_url="{OPEN_METEO_API_BASE}",status="200"}}' in body
+        assert f'open_meteo_upstream_response_bytes_count{{base_url="{OPEN_METEO_API_BASE}"}}' in body
+        assert 'open_meteo_tool_in_flight{tool="get_forecast"} 0' in body
+        assert 'open_meteo_http_pool_max_connections 100' in body
+    
+    @pytest.mark.asyncio
+    async def test_metrics_record_upstream_errors(self):
+        """Test that failed calls are counted with their status."""
+        import respx
+        from httpx import HTTPStatusError
+        
+        with respx.mock:
+            respx.get(OPEN_METEO_ARCHIVE_API_BASE).respond(status_code=503)
+            with pytest.raises(HTTPStatusError):
+                await get_historical_weather(
+                    latitude=52.52,
+                    longitude=13.419,
+                    start_date="2000-01-01",
+                    end_date="2000-01-02"
+                )
+        
+        body = (await metrics(AsyncMock())).body.decode()
+        assert 'open_meteo_tool_calls_total{tool="get_historical_weather",outcome="error"}' in body
+        assert f'open_meteo_upstream_requests_total{{base_url="{OPEN_METEO_ARCHIVE_API_BASE}",status="503"}}' in body
+    
+    @pytest.mark.asyncio
+    async def test_pool_connections_follow_trace_events(self, monkeypatch):
+        """Test that the request hook counts held and opened connections and keeps the span trace."""
+        import httpx
+        import open_meteo_server
+        
+        for metric in (open_meteo_server.HTTP_POOL_ACTIVE_CONNECTIONS, open_meteo_server.HTTP_POOL_CONNECTIONS_OPENED):
+            monkeypatch.setattr(metric, "values", {})
+        seen = []
+        
+        async def inner(event_name, info):
+            seen.append(event_name)
+        
+        fresh = httpx.Request("GET", "http://upstream/", extensions={"trace": inner})
+        reused = httpx.Request("GET", "http://upstream/")
+        failed = httpx.Request("GET", "http://upstream/")
+        for request in (fresh, reused, failed):
+            await open_meteo_server._track_pool_connection(request)
+        
+        await fresh.extensions["trace"]("connection.connect_tcp.started", {})
+        await fresh.extensions["trace"]("connection.connect_tcp.complete", {})
+        await reused.extensions["trace"]("http11.send_request_headers.started", {})
+        await failed.extensions["trace"]("http11.send_request_headers.started", {})
+        assert open_meteo_server.HTTP_POOL_ACTIVE_CONNECTIONS.values[()] == 3
+        
+        await fresh.extensions["trace"]("http11.response_closed.complete", {})
+        await failed.extensions["trace"]("http11.send_request_headers.failed", {})
+        await failed.extensions["trace"]("http11.response_closed.complete", {})
+        assert open_meteo_server.HTTP_POOL_ACTIVE_CONNECTIONS.values[()] == 1
+        assert open_meteo_server.HTTP_POOL_CONNECTIONS_OPENED.values[()] == 1
+        assert seen == ["connection.connect_tcp.started", "connection.connect_tcp.complete",
+                        "http11.response_closed.complete"]
+    
+    @pytest.mark.asyncio
+    async def test_shared_client_honours_proxy_environment(self, monkeypatch):
+        """Test that the long-lived upstream client is reused and still picks up HTTPS_PROXY."""
+        import open_meteo_server
+        
+        monkeypatch.setenv("HTTPS_PROXY", "http://proxy.invalid:3128")
+        monkeypatch.setattr(open_meteo_server, "_shared_client", None)
+        
+        client = await open_meteo_server._http_client()
+        
+        assert client is await open_meteo_server._http_client()
+        assert len(client._mounts) == 1
+    
+    @pytest.mark.asyncio
+    async def test_stale_worker_snapshots_drop_their_gauges(self, tmp_path, monkeypatch):
+        """Test that an exited worker's counters still count but its gauges do not."""
+        import open_meteo_server
+        
+        monkeypatch.setattr(open_meteo_server, "METRICS_DIR", str(tmp_path))
+        for pid, in_flight, age in ((111, 3, 0), (222, 7, 60)):
+            path = tmp_path / f"{pid}.json"
+            path.write_text(json.dumps({
+                "open_meteo_tool_calls_total": [[["snapshot_tool", "ok"], 2]],
+                "open_meteo_tool_in_flight": [[["snapshot_tool"], in_flight]],
+            }))
+            mtime = path.stat().st_mtime - age
+            os.utime(path, (mtime, mtime))
+        
+        body = (await metrics(AsyncMock())).body.decode()
+        
+        assert 'open_meteo_tool_calls_total{tool="snapshot_tool",outcome="ok"} 4' in body
+        assert 'open_meteo_tool_in_flight{tool="snapshot_tool"} 3' in body
+
+
+class TestTracing:
+    """Tests for span instrumentation and the profiler admin route."""
+    
+    @pytest.mark.asyncio
+    async def test_tool_call_produces_nested_spans(self, monkeypatch):
+        """Test that tool, upstream and decode spans share one trace."""
+        import open_meteo_tracing
+        
+        exporter = open_meteo_tracing.RingBufferSpanExporter()
+        monkeypatch.setattr(open_meteo_tracing, "_span_exporters", [exporter])
+        
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_instance = mock_client.return_value.__aenter__.return_value
+            mock_instance.get = AsyncMock(return_value=AsyncMock(
+                status_code=200,
+                json=lambda: {"data": "test"},
+                raise_for_status=lambda: None
+            ))
+            
+            await get_previous_model_runs(
+                latitude=52.52,
+                longitude=13.419,
+                start_date="2024-01-01",
+                end_date="2024-01-02"
+            )
+            
+            # Sampled traces ask httpcore for per-phase trace events
+            assert "trace" in mock_instance.get.call_args[1]["extensions"]
+        
+        spans = {span.name: span for span in exporter.spans}
+        assert set(spans) == {"tool.get_previous_model_runs", "params.expand", "upstream", "json.decode"}
+        root = spans["tool.get_previous_model_runs"]
+        assert root.parent_id is None
+        assert spans["upstream"].parent_id == root.span_id
+        assert spans["json.decode"].parent_id == spans["upstream"].span_id
+        assert len({span.trace_id for span in exporter.spans}) == 1
+        assert spans["upstream"].attributes["http.status_code"] == 200
+    
+    @pytest.mark.asyncio
+    async def test_mcp_call_tool_is_the_root_span(self, monkeypatch, sample_forecast_response):
+        """Test that calls through FastMCP are traced from validation to serialized content."""
+        import respx
+        import open_meteo_tracing
+        
+        exporter = open_meteo_tracing.RingBufferSpanExporter()
+        monkeypatch.setattr(open_meteo_tracing, "_span_exporters", [exporter])
+        
+        with respx.mock:
+            respx.get(OPEN_METEO_API_BASE).respond(json=sample_forecast_response)
+            await mcp.call_tool("get_forecast", {"latitude": 52.52, "longitude": 13.419})
+        
+        spans = {span.name: span for span in exporter.spans}
+        root = spans["mcp.call_tool"]
+        assert root.parent_id is None
+        assert root.attributes == {"tool": "get_forecast"}
+        assert spans["tool.get_forecast"].parent_id == root.span_id
+        assert root.end_ns >= spans["tool.get_forecast"].end_ns
+    
+    @pytest.mark.asyncio
+    async def test_unsampled_traces_record_nothing(self, monkeypatch):
+        """Test that a zero sample rate suppresses the whole trace."""
+        import open_meteo_tracing
+        
+        exporter = open_meteo_tracing.RingBufferSpanExporter()
+        monkeypatch.setattr(open_meteo_tracing, "_span_exporters", [exporter])
+        monkeypatch.setattr(open_meteo_tracing, "TRACE_SAMPLE_RATE", 0.0)
+        
+        with open_meteo_tracing.span("root"):
+            with open_meteo_tracing.span("child") as child:
+                assert child is open_meteo_tracing.NOOP_SPAN
+        
+        assert len(exporter.spans) == 0
+    
+    def test_otlp_encoding(self):
+        """Test that spans are encoded as OTLP/JSON resource spans."""
+        import open_meteo_tracing
+        
+        root = open_meteo_tracing.Span("root", attributes={"tool": "get_forecast", "retries": 2})
+        child = open_meteo_tracing.Span("child", root)
+        child.error = "ValueError()"
+        
+        payload = open_meteo_tracing.OTLPSpanExporter().encode([root, child])
+        spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        
+        assert "parentSpanId" not in spans[0]
+        assert spans[1]["parentSpanId"] == root.span_id
+        assert spans[1]["status"] == {"code": 2, "message": "ValueError()"}
+        assert {"key": "retries", "value": {"intValue": "2"}} in spans[0]["attributes"]
+    
+    @pytest.mark.asyncio
+    async def test_profiler_admin_route(self):
+        """Test starting and stopping the sampling profiler over HTTP."""
+        import time
+        from open_meteo_server import admin_profiler
+        
+        local = Mock(host="127.0.0.1")
+        start = AsyncMock(method="POST", query_params={"action": "start", "interval_ms": "1"}, headers={},
+                          client=local)
+        response = await admin_profiler(start)
+        assert response.status_code == 200
+        
+        # Keep the event loop thread busy so samples land in this test
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        
+        stop = AsyncMock(method="POST", query_params={"action": "stop"}, headers={}, client=local)
+        response = await admin_profiler(stop)
+        assert response.status_code == 200
+        assert b"test_profiler_admin_route" in response.body
+    
+    @pytest.mark.asyncio
+    async def test_admin_routes_reject_remote_clients_and_bad_arguments(self, monkeypatch):
+        """Test the loopback default, the bearer token, and 400s for bad query values."""
+        import open_meteo_server
+        import open_meteo_tracing
+        from open_meteo_server import admin_profiler, admin_traces
+        
+        def request(host, query, authorization=None):
+            headers = {"authorization": authorization} if authorization else {}
+            return AsyncMock(method="POST", query_params=query, headers=headers, client=Mock(host=host))
+        
+        spin = {"action": "start", "interval_ms": "0"}
+        assert (await admin_profiler(request("10.0.0.7", spin))).status_code == 403
+        assert (await admin_profiler(request("127.0.0.1", spin))).status_code == 400
+        assert (await admin_profiler(request("127.0.0.1", {"action": "start", "interval_ms": "fast"}))).status_code == 400
+        monkeypatch.setattr(open_meteo_tracing, "span_ring_buffer", open_meteo_tracing.RingBufferSpanExporter())
+        assert (await admin_traces(request("127.0.0.1", {"limit": "x"}))).status_code == 400
+        
+        monkeypatch.setattr(open_meteo_server, "ADMIN_TOKEN", "secret")
+        assert (await admin_profiler(request("10.0.0.7", spin, "Bearer wrong"))).status_code == 401
+        assert (await admin_profiler(request("10.0.0.7", spin, "Bearer secret"))).status_code == 400
+
+
+class TestSharedResponseCache:
+    """Tests for the cross-process response cache and single-flight fetching."""
+    
+    def test_lease_is_exclusive_across_instances(self, tmp_path):
+        """Test that two processes' caches cannot both own a key's lease."""
+        from open_meteo_server import SharedResponseCache
+        
+        path = str(tmp_path / "cache.sqlite3")
+        worker_a = SharedResponseCache(path)
+        worker_b = SharedResponseCache(path)
+        
+        assert worker_a.acquire_sync("k")
+        assert not worker_b.acquire_sync("k")
+        assert worker_b.leased_sync("k")
+        
+        worker_a.put_sync("k", b'{"a": 1}', ttl=60)
+        worker_a.release_sync("k")
+        
+        assert worker_b.get_sync("k") == b'{"a": 1}'
+        assert worker_b.acquire_sync("k")
+    
+    def test_expired_lease_can_be_taken_over(self, tmp_path):
+        """Test that a crashed owner's lease does not block others forever."""
+        from open_meteo_server import SharedResponseCache
+        
+        path = str(tmp_path / "cache.sqlite3")
+        crashed = SharedResponseCache(path, lease_seconds=-1)
+        assert crashed.acquire_sync("k")
+        
+        assert SharedResponseCache(path).acquire_sync("k")
+    
+    def test_expired_entries_are_misses(self, tmp_path):
+        """Test that entries past their TTL are not served."""
+        from open_meteo_server import SharedResponseCache
+        
+        cache = SharedResponseCache(str(tmp_path / "cache.sqlite3"))
+        cache.put_sync("k", b"{}", ttl=-1)
+        
+        assert cache.get_sync("k") is None
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_calls_share_one_fetch(self, tmp_path, monkeypatch, sample_forecast_response):
+        """Test that concurrent and repeated identical calls reach upstream once."""
+        import asyncio
+        import respx
+        import open_meteo_server
+        
+        cache = open_meteo_server.SharedResponseCache(str(tmp_path / "cache.sqlite3"))
+        monkeypatch.setattr(open_meteo_server, "response_cache", cache)
+        
+        with respx.mock:
+            route = respx.get(OPEN_METEO_API_BASE).respond(json=sample_forecast_response)
+            results = await asyncio.gather(*(
+                get_forecast(latitude=52.52, longitude=13.419) for _ in range(5)
+            ))
+            again = await get_forecast(latitude=52.52, longitude=13.419)
+        
+        assert route.call_count == 1
+        assert all(result == sample_forecast_response for result in results)
+        assert again == sample_forecast_response
+    
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self, tmp_path, monkeypatch):
+        """Test that failed upstream responses are retried on the next call."""
+        import respx
+        from httpx import HTTPStatusError
+        import open_meteo_server
+        
+        cache = open_meteo_server.SharedResponseCache(str(tmp_path / "cache.sqlite3"))
+        monkeypatch.setattr(open_meteo_server, "response_cache", cache)
+        
+        with respx.mock:
+            route = respx.get(OPEN_METEO_API_BASE).respond(status_code=500)
+            for _ in range(2):
+                with pytest.raises(HTTPStatusError):
+                    await get_forecast(latitude=1.0, longitude=2.0)
+        
+        assert route.call_count == 2
+        assert not cache.leased_sync(cache.key(OPEN_METEO_API_BASE, {
+            "latitude": 1.0, "longitude": 2.0, "hourly": "temperature_2m", "models": "gfs_seamless"
+        }))
+
+
+def hourly_response(hours):
+    """An archive response with `hours` rows of two hourly variables from 2020-01-01."""
+    start = datetime(2020, 1, 1)
+    return {
+        "latitude": 52.52,
+        "longitude": 13.419,
+        "hourly_units": {"time": "iso8601", "temperature_2m": "°C", "precipitation": "mm"},
+        "hourly": {
+            "time": [(start + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(hours)],
+            "temperature_2m": [float(h) for h in range(hours)],
+            "precipitation": [0.1] * hours
+        }
+    }
+
+
+class TestLargeResults:
+    """Tests for returning large results as paginated resources."""
+    
+    @pytest.fixture(autouse=True)
+    def small_limits(self, monkeypatch):
+        import open_meteo_server
+        
+        monkeypatch.setattr(open_meteo_server, "INLINE_RESULT_MAX_VALUES", 100)
+        monkeypatch.setattr(open_meteo_server, "RESULT_PAGE_ROWS", 24)
+        monkeypatch.setattr(open_meteo_server, "result_store", open_meteo_server.ResultStore())
+    
+    @pytest.mark.asyncio
+    async def test_large_result_is_returned_as_handle(self):
+        """Test that a large result is summarised and its pages cover every row."""
+        import respx
+        
+        with respx.mock:
+            respx.get(OPEN_METEO_ARCHIVE_API_BASE).respond(json=hourly_response(60))
+            handle = await get_historical_weather(
+                latitude=52.52, longitude=13.419, start_date="2020-01-01", end_date="2020-01-03",
+                hourly="temperature_2m,precipitation"
+            )
+        
+        assert "hourly" not in handle
+        assert handle["hourly_units"]["temperature_2m"] == "°C"
+        section = handle["result"]["sections"]["hourly"]
+        assert section == {
+            "variables": ["temperature_2m", "precipitation"],
+            "rows": 60,
+            "start": "2020-01-01T00:00",
+            "end": "2020-01-03T11:00",
+            "pages": 3,
+            "first_page": f"{handle['result']['uri']}/hourly/page/0"
+        }
+        
+        uri, temperatures = section["first_page"], []
+        while uri:
+            contents = await mcp.read_resource(uri)
+            page = json.loads(contents[0].content)
+            temperatures += page["hourly"]["temperature_2m"]
+            uri = page.get("next")
+        assert temperatures == [float(h) for h in range(60)]
+    
+    @pytest.mark.asyncio
+    async def test_window_and_variable_selection(self):
+        """Test slicing by time window and variable through the resource and the tool."""
+        import respx
+        import open_meteo_server
+        
+        with respx.mock:
+            respx.get(OPEN_METEO_ARCHIVE_API_BASE).respond(json=hourly_response(60))
+            handle = await get_historical_weather(
+                latitude=52.52, longitude=13.419, start_date="2020-01-01", end_date="2020-01-03",
+                hourly="temperature_2m,precipitation"
+            )
+        result_id = handle["result"]["id"]
+        
+        contents = await mcp.read_resource(
+            f"open-meteo://results/{result_id}/hourly/precipitation/2020-01-02/2020-01-02"
+        )
+        window = json.loads(contents[0].content)
+        assert window["offset"] == 24
+        assert window["rows"] == 24
+        assert list(window["hourly"]) == ["time", "precipitation"]
+        assert window["hourly_units"] == {"time": "iso8601", "precipitation": "mm"}
+        
+        tail = await open_meteo_server.read_result(
+            result_id=result_id, variables="temperature_2m", start="2020-01-03T10:00"
+        )
+        assert tail["hourly"] == {
+            "time": ["2020-01-03T10:00", "2020-01-03T11:00"],
+            "temperature_2m": [58.0, 59.0]
+        }
+        
+        with pytest.raises(ValueError, match="Unknown variable"):
+            await open_meteo_server.read_result(result_id=result_id, variables="snowfall")
+    
+    @pytest.mark.asyncio
+    async def test_other_worker_reads_from_shared_cache(self, tmp_path, monkeypatch):
+        """Test that a worker without the result in memory rebuilds it from the shared cache."""
+        import respx
+        import open_meteo_server
+        
+        cache = open_meteo_server.SharedResponseCache(str(tmp_path / "cache.sqlite3"))
+        monkeypatch.setattr(open_meteo_server, "response_cache", cache)
+        with respx.mock:
+            respx.get(OPEN_METEO_ARCHIVE_API_BASE).respond(json=hourly_response(60))
+            handle = await get_historical_weather(
+                latitude=52.52, longitude=13.419, start_date="2020-01-01", end_date="2020-01-03",
+                hourly="temperature_2m,precipitation"
+            )
+        
+        monkeypatch.setattr(open_meteo_server, "result_store", open_meteo_server.ResultStore())
+        page = await open_meteo_server.read_result(result_id=handle["result"]["id"], page=2)
+        assert page["offset"] == 48
+        assert page["rows"] == 12
+        # The rebuilt result keeps the archive TTL of the row it came from
+        assert open_meteo_server.result_store.expires_in(handle["result"]["id"]) > 86000
+        
+        monkeypatch.setattr(open_meteo_server, "response_cache", None)
+        monkeypatch.setattr(open_meteo_server, "result_store", open_meteo_server.ResultStore())
+        with pytest.raises(ValueError, match="expired"):
+            await open_meteo_server.read_result(result_id=handle["result"]["id"])
+    
+    @pytest.mark.asyncio
+    async def test_cached_result_advertises_remaining_lifetime(self, tmp_path, monkeypatch):
+        """Test that a result served from a shared cache row expires with that row, not a full TTL later."""
+        import time
+        import respx
+        import open_meteo_server
+        
+        cache = open_meteo_server.SharedResponseCache(str(tmp_path / "cache.sqlite3"))
+        monkeypatch.setattr(open_meteo_server, "response_cache", cache)
+        arguments = dict(latitude=52.52, longitude=13.419, start_date="2020-01-01", end_date="2020-01-03",
+                         hourly="temperature_2m,precipitation")
+        with respx.mock:
+            respx.get(OPEN_METEO_ARCHIVE_API_BASE).respond(json=hourly_response(60))
+            fresh = await get_historical_weather(**arguments)
+        assert fresh["result"]["expires_in_seconds"] == 86400
+        
+        # Another worker fetched it long ago: the row has 30 seconds left
+        cache._db().execute("UPDATE responses SET expires = ?", (time.time() + 30,))
+        monkeypatch.setattr(open_meteo_server, "result_store", open_meteo_server.ResultStore())
+        cached = await get_historical_weather(**arguments)
+        
+        assert 0 < cached["result"]["expires_in_seconds"] <= 30
+        assert open_meteo_server.result_store.expires_in(cached["result"]["id"]) <= 30
+    
+    def test_store_evicts_least_recently_read(self):
+        """Test that the store stays within its value budget."""
+        from open_meteo_server import ResultStore
+        
+        store = ResultStore(max_values=400)
+        store.put("a", hourly_response(60), ttl=60)
+        store.put("b", hourly_response(60), ttl=60)
+        store.get("a")
+        store.put("c", hourly_response(60), ttl=60)
+        
+        assert store.get("b") is None
+        assert store.get("a") is not None
+        assert store.values == 360
+
+
+def archive_upstream(request):
+    """Fake archive API: one row per hour of the requested dates for each hourly variable."""
+    import httpx
+    
+    params = request.url.params
+    first = datetime.fromisoformat(params["start_date"])
+    hours = ((datetime.fromisoformat(params["end_date"]) - first).days + 1) * 24
+    data = hourly_response(0)
+    data["hourly"] = {"time": [(first + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(hours)]}
+    for name in params["hourly"].split(","):
+        data["hourly"][name] = [1.0] * hours
+    if "daily" in params:
+        data["daily_units"] = {"time": "iso8601"}
+        data["daily"] = {"time": [(first + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(hours // 24)]}
+        for name in params["daily"].split(","):
+            data["daily"][name] = [2.0] * (hours // 24)
+    return httpx.Response(200, json=data)
+
+
+class TestChunkedFetches:
+    """Tests for chunked long pulls with progress, partial results and cancellation."""
+    
+    def test_small_requests_are_not_split(self):
+        """Test that requests under the value budget stay one upstream request."""
+        from open_meteo_server import _plan_chunks
+        
+        params = {"start_date": "2020-01-01", "end_date": "2020-12-31", "hourly": "temperature_2m"}
+        assert _plan_chunks(params, [["temperature_2m"]]) == [params]
+    
+    def test_split_per_year_then_per_variable_group(self, monkeypatch):
+        """Test that long ranges split per calendar year, and large years per variable group."""
+        import open_meteo_server
+        from open_meteo_server import _plan_chunks
+        
+        params = {"start_date": "2019-07-01", "end_date": "2021-03-31", "hourly": "a,b,b_previous_day1",
+                  "models": "m1,m2"}
+        # 3 variables x 2 models x 24 hours: 52704 values in 2020, 92448 in all
+        monkeypatch.setattr(open_meteo_server, "CHUNK_MAX_VALUES", 60000)
+        chunks = _plan_chunks(params, [["a"], ["b", "b_previous_day1"]])
+        assert [(c["start_date"], c["end_date"], c["hourly"]) for c in chunks] == [
+            ("2019-07-01", "2019-12-31", "a,b,b_previous_day1"),
+            ("2020-01-01", "2020-12-31", "a,b,b_previous_day1"),
+            ("2021-01-01", "2021-03-31", "a,b,b_previous_day1"),
+        ]
+        
+        monkeypatch.setattr(open_meteo_server, "CHUNK_MAX_VALUES", 40000)
+        chunks = _plan_chunks(params, [["a"], ["b", "b_previous_day1"]])
+        assert [(c["start_date"], c["hourly"]) for c in chunks][:3] == [
+            ("2019-07-01", "a"), ("2019-07-01", "b,b_previous_day1"), ("2020-01-01", "a")
+        ]
+        assert all(c["models"] == "m1,m2" for c in chunks)
+    
+    @pytest.mark.asyncio
+    async def test_progress_and_partial_results(self):
+        """Test that each chunk is reported to the client and the merged result is complete."""
+        import respx
+        import open_meteo_server
+        from mcp.shared.memory import create_connected_server_and_client_session
+        
+        progress, partials = [], []
+        
+        async def on_progress(done, total, message):
+            progress.append((done, total))
+        
+        async def on_log(params):
+            partials.append(params)
+        
+        async with create_connected_server_and_client_session(mcp._mcp_server, logging_callback=on_log) as client:
+            with respx.mock:
+                route = respx.get(OPEN_METEO_ARCHIVE_API_BASE).mock(side_effect=archive_upstream)
+                result = await client.call_tool("get_historical_weather", {
+                    "latitude": 52.52, "longitude": 13.419, "start_date": "2017-01-01", "end_date": "2020-12-31",
+                    "hourly": "temperature_2m,precipitation", "partial_results": True
+                }, progress_callback=on_progress)
+        
+        assert route.call_count == 4
+        assert sorted(progress) == [(1, 4), (2, 4), (3, 4), (4, 4)]
+        assert sorted(p.data["start_date"] for p in partials) == [
+            "2017-01-01", "2018-01-01", "2019-01-01", "2020-01-01"
+        ]
+        assert all(p.logger == open_meteo_server.PARTIAL_RESULT_LOGGER for p in partials)
+        
+        handle = json.loads(result.content[0].text)
+        page = await open_meteo_server.read_result(
+            result_id=handle["result"]["id"], start="2017-12-31T23:00", end="2018-01-01T00:00"
+        )
+        assert handle["result"]["sections"]["hourly"]["rows"] == 1461 * 24
+        assert page["hourly"]["time"] == ["2017-12-31T23:00", "2018-01-01T00:00"]
+    
+    @pytest.mark.asyncio
+    async def test_cancellation_aborts_upstream_requests(self):
+        """Test that cancelling the MCP request cancels the chunk fetches in flight."""
+        import asyncio
+        import respx
+        from mcp import types
+        from mcp.shared.exceptions import McpError
+        from mcp.shared.memory import create_connected_server_and_client_session
+        
+        started, aborted = asyncio.Event(), []
+        
+        async def hang(request):
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                aborted.append(request.url.params["start_date"])
+                raise
+        
+        async with create_connected_server_and_client_session(mcp._mcp_server) as client:
+            with respx.mock:
+                respx.get(OPEN_METEO_ARCHIVE_API_BASE).mock(side_effect=hang)
+                call = asyncio.create_task(client.call_tool("get_historical_weather", {
+                    "latitude": 52.52, "longitude": 13.419, "start_date": "2013-01-01", "end_date": "2020-12-31",
+                    "hourly": "temperature_2m"
+                }))
+                await asyncio.wait_for(started.wait(), 5)
+                await asyncio.sleep(0.05)
+                await client.send_notification(types.ClientNotification(types.CancelledNotification(
+                    method="notifications/cancelled", params=types.CancelledNotificationParams(requestId=1)
+                )))
+                with pytest.raises(McpError, match="cancelled"):
+                    await asyncio.wait_for(call, 5)
+        
+        # CHUNK_CONCURRENCY requests were in flight; the queued years never started
+        assert sorted(aborted) == ["2013-01-01", "2014-01-01", "2015-01-01", "2016-01-01"]
+
+
+class TestExport:
+    """Tests for streaming archive exports to local files."""
+    
+    @pytest.fixture(autouse=True)
+    def export_dir(self, tmp_path, monkeypatch):
+        import open_meteo_server
+        
+        monkeypatch.setattr(open_meteo_server, "EXPORT_DIR", str(tmp_path))
+        monkeypatch.setattr(open_meteo_server, "CHUNK_MAX_VALUES", 10000)
+        return tmp_path
+    
+    @pytest.mark.asyncio
+    async def test_csv_export_in_date_order(self, export_dir):
+        """Test that every chunk lands in the section files in date order."""
+        import csv
+        import respx
+        from open_meteo_server import export_historical_weather
+        
+        with respx.mock:
+            route = respx.get(OPEN_METEO_ARCHIVE_API_BASE).mock(side_effect=archive_upstream)
+            summary = await export_historical_weather(
+                latitude=52.52, longitude=13.419, start_date="2019-12-01", end_date="2021-01-31",
+                hourly="temperature_2m,precipitation", daily="precipitation_sum", file_format="csv"
+            )
+        
+        assert route.call_count == 3
+        assert summary["format"] == "csv"
+        assert summary["chunks"] == 3
+        hourly, daily = summary["files"]["hourly"], summary["files"]["daily"]
+        assert (hourly["rows"], hourly["start"], hourly["end"]) == (428 * 24, "2019-12-01T00:00", "2021-01-31T23:00")
+        assert daily["rows"] == 428
+        assert hourly["columns"] == ["time", "temperature_2m", "precipitation"]
+        assert hourly["units"]["temperature_2m"] == "°C"
+        
+        with open(hourly["path"], newline="") as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ["time", "temperature_2m", "precipitation"]
+        assert [row[0] for row in rows[1:]] == sorted(row[0] for row in rows[1:])
+        assert len(rows) == hourly["rows"] + 1
+        assert sorted(p.name.rsplit("_", 1)[1] for p in export_dir.iterdir()) == ["daily.csv", "hourly.csv"]
+    
+    @pytest.mark.asyncio
+    async def test_export_chunks_skip_the_shared_cache(self, tmp_path, monkeypatch):
+        """Test that exported years are fetched from upstream without filling the response cache."""
+        import respx
+        import open_meteo_server
+        from open_meteo_server import export_historical_weather
+        
+        cache = open_meteo_server.SharedResponseCache(str(tmp_path / "cache.sqlite3"))
+        monkeypatch.setattr(open_meteo_server, "response_cache", cache)
+        arguments = dict(latitude=52.52, longitude=13.419, start_date="2019-12-01", end_date="2021-01-31",
+                         hourly="temperature_2m", file_format="csv")
+        
+        with respx.mock:
+            route = respx.get(OPEN_METEO_ARCHIVE_API_BASE).mock(side_effect=archive_upstream)
+            await export_historical_weather(**arguments)
+            await export_historical_weather(**arguments)
+        
+        assert route.call_count == 6
+        assert cache._db().execute("SELECT COUNT(*) FROM responses").fetchone() == (0,)
+        body = (await metrics(AsyncMock())).body.decode()
+        assert f'open_meteo_upstream_requests_total{{base_url="{OPEN_METEO_ARCHIVE_API_BASE}",status="200"}}' in body
+    
+    @pytest.mark.asyncio
+    async def test_parquet_export(self):
+        """Test that Parquet exports get a typed schema and a row group per chunk."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        import respx
+        from open_meteo_server import export_historical_weather
+        
+        with respx.mock:
+            respx.get(OPEN_METEO_ARCHIVE_API_BASE).mock(side_effect=archive_upstream)
+            summary = await export_historical_weather(
+                latitude=52.52, longitude=13.419, start_date="2019-12-01", end_date="2021-01-31",
+                hourly="temperature_2m", daily="precipitation_sum"
+            )
+        
+        hourly = pq.ParquetFile(summary["files"]["hourly"]["path"])
+        assert hourly.num_row_groups == 3
+        assert str(hourly.schema_arrow.field("time").type).startswith("timestamp")
+        assert str(hourly.schema_arrow.field("temperature_2m").type) == "double"
+        daily = pq.read_table(summary["files"]["daily"]["path"])
+        assert str(daily.schema.field("time").type) == "date32[day]"
+        assert json.loads(daily.schema.metadata[b"open_meteo"])["latitude"] == 52.52
+    
+    @pytest.mark.asyncio
+    async def test_falls_back_to_csv_without_pyarrow(self, monkeypatch):
+        """Test that a missing pyarrow degrades to CSV instead of failing."""
+        import sys
+        import respx
+        from open_meteo_server import export_historical_weather
+        
+        monkeypatch.setitem(sys.modules, "pyarrow", None)
+        with respx.mock:
+            respx.get(OPEN_METEO_ARCHIVE_API_BASE).mock(side_effect=archive_upstream)
+            summary = await export_historical_weather(
+                latitude=52.52, longitude=13.419, start_date="2020-01-01", end_date="2020-01-02",
+                hourly="temperature_2m", file_format="arrow"
+            )
+        
+        assert summary["format"] == "csv"
+        assert "pyarrow" in summary["note"]
+        assert summary["files"]["hourly"]["path"].endswith(".csv")
+    
+    @pytest.mark.asyncio
+    async def test_failed_export_leaves_no_files(self, export_dir):
+        """Test that an upstream error part-way removes the partial files."""
+        import httpx
+        import respx
+        from httpx import HTTPStatusError
+        from open_meteo_server import export_historical_weather
+        
+        def fail_2020(request):
+            if request.url.params["start_date"].startswith("2020"):
+                return httpx.Response(500)
+            return archive_upstream(request)
+        
+        with respx.mock:
+            respx.get(OPEN_METEO_ARCHIVE_API_BASE).mock(side_effect=fail_2020)
+            with pytest.raises(HTTPStatusError):
+                await export_historical_weather(
+                    latitude=52.52, longitude=13.419, start_date="2019-01-01", end_date="2020-12-31",
+                    hourly="temperature_2m", file_format="csv"
+                )
+        
+        assert list(export_dir.iterdir()) == []
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_exports(self, export_dir):
+        """Test that two identical exports at once write separate temporary files and both succeed."""
+        import asyncio
+        import csv
+        import respx
+        from open_meteo_server import export_historical_weather
+        
+        arguments = dict(latitude=52.52, longitude=13.419, start_date="2019-12-01", end_date="2021-01-31",
+                         hourly="temperature_2m", file_format="csv")
+        with respx.mock:
+            respx.get(OPEN_METEO_ARCHIVE_API_BASE).mock(side_effect=archive_upstream)
+            first, second = await asyncio.gather(
+                export_historical_weather(**arguments), export_historical_weather(**arguments)
+            )
+        
+        path = first["files"]["hourly"]["path"]
+        assert second["files"]["hourly"]["path"] == path
+        assert [p.name for p in export_dir.iterdir()] == [os.path.basename(path)]
+        with open(path, newline="") as f:
+            rows = list(csv.reader(f))
+        assert len(rows) == first["files"]["hourly"]["rows"] + 1
+        assert rows.count(["time", "temperature_2m"]) == 1
+
+
+class TestEnsembleForecast:
+    """Tests for the ensemble summary tool."""
+    
+    @pytest.fixture(params=["numpy", "python"])
+    def backend(self, request, monkeypatch):
+        import sys
+        
+        if request.param == "numpy":
+            pytest.importorskip("numpy")
+        else:
+            monkeypatch.setitem(sys.modules, "numpy", None)
+        return request.param
+    
+    def test_stats_per_timestep(self, backend):
+        """Test member statistics, ignoring missing values, with and without numpy."""
+        from open_meteo_server import _ensemble_stats
+        
+        members = [
+            [1.0, 10.0, None],
+            [2.0, None, None],
+            [4.0, 30.0, None],
+            [5.0, 20.0, None],
+        ]
+        stats = _ensemble_stats(members, [50, 90], [(">", 2.0)])
+        
+        assert stats["mean"] == [3.0, 20.0, None]
+        assert stats["spread"][:2] == pytest.approx([1.58, 8.16]) and stats["spread"][2] is None
+        assert stats["min"] == [1.0, 10.0, None]
+        assert stats["max"] == [5.0, 30.0, None]
+        assert stats["p50"] == [3.0, 20.0, None]
+        assert stats["p90"][:2] == pytest.approx([4.7, 28.0]) and stats["p90"][2] is None
+        assert stats["prob_gt_2"] == [50.0, 100.0, None]
+    
+    @pytest.mark.asyncio
+    async def test_summary_replaces_member_series(self, backend):
+        """Test that the tool fetches every member and returns one row per statistic."""
+        import respx
+        from open_meteo_server import get_ensemble_forecast
+        
+        hourly = {"time": ["2024-01-01T00:00", "2024-01-01T01:00"], "temperature_2m": [1.0, -1.0]}
+        for member in range(1, 4):
+            hourly[f"temperature_2m_member{member:02d}"] = [1.0 + member, -1.0 - member]
+        hourly["precipitation"] = [0.0, 2.0]
+        data = {
+            "latitude": 52.52,
+            "longitude": 13.419,
+            "hourly_units": {"time": "iso8601", "temperature_2m": "°C", "precipitation": "mm"},
+            "hourly": hourly
+        }
+        
+        with respx.mock:
+            route = respx.get(OPEN_METEO_ENSEMBLE_API_BASE).respond(json=data)
+            result = await get_ensemble_forecast(
+                latitude=52.52, longitude=13.419, hourly="temperature_2m,snowfall", forecast_days=2,
+                percentiles="50", thresholds="temperature_2m<0,precipitation>=1"
+            )
+        
+        query = route.calls.last.request.url.params
+        assert query["hourly"] == "temperature_2m,snowfall,precipitation"
+        assert query["models"] == "ecmwf_ifs025"
+        assert query["forecast_days"] == "2"
+        assert result["members"] == {"temperature_2m": 4, "precipitation": 1}
+        assert result["missing_variables"] == ["snowfall"]
+        assert result["hourly"]["temperature_2m_p50"] == [2.5, -2.5]
+        assert result["hourly"]["temperature_2m_prob_lt_0"] == [0.0, 100.0]
+        assert result["hourly"]["precipitation_prob_ge_1"] == [0.0, 100.0]
+        assert result["hourly_units"]["temperature_2m_mean"] == "°C"
+        assert result["hourly_units"]["precipitation_prob_ge_1"] == "%"
+        assert not any("member" in name for name in result["hourly"])
+    
+    @pytest.mark.asyncio
+    async def test_invalid_arguments(self):
+        """Test validation of thresholds, percentiles and models."""
+        from open_meteo_server import get_ensemble_forecast
+        
+        with pytest.raises(ValueError, match="Invalid threshold"):
+            await get_ensemble_forecast(latitude=0, longitude=0, thresholds="precipitation=5")
+        with pytest.raises(ValueError, match="not a number"):
+            await get_ensemble_forecast(latitude=0, longitude=0, thresholds="precipitation>lots")
+        with pytest.raises(ValueError, match="between 0 and 100"):
+            await get_ensemble_forecast(latitude=0, longitude=0, percentiles="50,150")
+        with pytest.raises(ValueError, match="one ensemble model"):
+            await get_ensemble_forecast(latitude=0, longitude=0, model="gfs025,icon_seamless")
+
+
+class TestCatalog:
+    """Tests for fail-fast validation against the local variable and model catalog."""
+    
+    @pytest.mark.asyncio
+    async def test_typos_are_rejected_before_fetching(self):
+        """Test that every unknown name is reported at once, with suggestions, and nothing is fetched."""
+        import respx
+        
+        with respx.mock:
+            route = respx.get(OPEN_METEO_API_BASE).respond(json={})
+            with pytest.raises(ValueError) as error:
+                await get_forecast(latitude=52.52, longitude=13.419, hourly="temprature_2m,precipitation",
+                                   models="gfs_seamles")
+        
+        assert route.call_count == 0
+        assert "Unknown hourly variable 'temprature_2m' for get_forecast (did you mean 'temperature_2m'" in str(error.value)
+        assert "Unknown model 'gfs_seamles' for get_forecast (did you mean 'gfs_seamless'" in str(error.value)
+    
+    @pytest.mark.asyncio
+    async def test_endpoint_support_and_date_coverage(self):
+        """Test that names served by another tool, and dates outside an API's range, point the way."""
+        from open_meteo_server import get_ensemble_forecast
+        
+        with pytest.raises(ValueError, match="only from get_historical_weather"):
+            await get_forecast(latitude=0, longitude=0, hourly="soil_temperature_0_to_7cm")
+        with pytest.raises(ValueError, match="'gfs_global' is not available from get_ensemble_forecast"):
+            await get_ensemble_forecast(latitude=0, longitude=0, model="gfs_global")
+        with pytest.raises(ValueError, match="start_date 1930-01-01 is outside the range of get_historical_weather"):
+            await get_historical_weather(latitude=0, longitude=0, start_date="1930-01-01", end_date="1930-12-31",
+                                         daily="temperature_2m_max")
+        with pytest.raises(ValueError, match="after end_date"):
+            await get_historical_forecast(latitude=0, longitude=0, start_date="2024-02-01", end_date="2024-01-01")
+        with pytest.raises(ValueError, match="YYYY-MM-DD"):
+            await get_previous_model_runs(latitude=0, longitude=0, start_date="2024-1-1", end_date="2024-01-02")
+        with pytest.raises(ValueError, match="previous days go from 1 to 7"):
+            await get_previous_model_runs(latitude=0, longitude=0, start_date="2024-01-01", end_date="2024-01-02",
+                                          hourly="temperature_2m_previous_day8")
+    
+    @pytest.mark.asyncio
+    async def test_catalog_drives_previous_day_expansion(self):
+        """Test that only variables with earlier runs in the catalog get _previous_dayN columns."""
+        import respx
+        
+        with respx.mock:
+            route = respx.get(OPEN_METEO_PREVIOUS_RUNS_API_BASE).respond(json={"hourly": {}})
+            await get_previous_model_runs(latitude=0, longitude=0, start_date="2024-01-01", end_date="2024-01-02",
+                                          hourly="cloud_cover,is_day,temperature_850hPa", previous_days=2)
+        
+        assert route.calls.last.request.url.params["hourly"] == (
+            "cloud_cover,cloud_cover_previous_day1,cloud_cover_previous_day2,is_day,temperature_850hPa"
+        )
+    
+    @pytest.mark.asyncio
+    async def test_validation_can_be_disabled(self, monkeypatch):
+        """Test that OPEN_METEO_CATALOG_VALIDATION=0 passes names the catalog does not know upstream."""
+        import respx
+        import open_meteo_server
+        
+        monkeypatch.setattr(open_meteo_server, "CATALOG_VALIDATION", False)
+        with respx.mock:
+            route = respx.get(OPEN_METEO_API_BASE).respond(json={"hourly": {}})
+            await get_forecast(latitude=0, longitude=0, hourly="brand_new_variable")
+        
+        assert route.calls.last.request.url.params["hourly"] == "brand_new_variable"
+    
+    @pytest.mark.asyncio
+    async def test_catalog_resource(self):
+        """Test that clients can read the catalog to plan a request."""
+        contents = await mcp.read_resource("open-meteo://catalog")
+        catalog = json.loads(contents[0].content)
+        
+        archive = catalog["endpoints"]["archive"]
+        assert archive["tool"] == "get_historical_weather"
+        assert archive["first_date"] == "1940-01-01"
+        assert "temperature_2m_max" in archive["daily"]
+        assert "wind_speed_10m" in catalog["endpoints"]["previous_runs"]["previous_day_variables"]
+        assert 850 in catalog["pressure_levels"]["levels"]
+
+
+class TestAdmissionControl:
+    """Tests for per-tool concurrency, fair queueing and load shedding over HTTP."""
+    
+    @pytest.fixture
+    def gated(self, monkeypatch):
+        """AdmissionControl around a stand-in MCP app whose tool calls block until released."""
+        import asyncio
+        import httpx
+        import open_meteo_server
+        from starlette.responses import JSONResponse
+        
+        monkeypatch.setattr(open_meteo_server, "TOOL_CONCURRENCY", 1)
+        monkeypatch.setattr(open_meteo_server, "TOOL_QUEUE_MAX", 3)
+        monkeypatch.setattr(open_meteo_server, "CLIENT_MAX_PENDING", 3)
+        monkeypatch.setattr(open_meteo_server, "TRUST_CLIENT_ID", True)
+        started, release = [], asyncio.Event()
+        
+        async def app(scope, receive, send):
+            body = json.loads((await receive())["body"])
+            started.append(body.get("id"))
+            if body.get("method") == "tools/call":
+                await release.wait()
+            await JSONResponse({"jsonrpc": "2.0", "id": body.get("id"), "result": {}})(scope, receive, send)
+        
+        admission = open_meteo_server.AdmissionControl(app, path="/mcp")
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=admission), base_url="http://test")
+        return admission, client, started, release
+    
+    @staticmethod
+    def call(client, message_id, client_id, tool="get_forecast", **headers):
+        body = {"jsonrpc": "2.0", "id": message_id, "method": "tools/call", "params": {"name": tool, "arguments": {}}}
+        return client.post("/mcp/", json=body, headers={"X-Client-Id": client_id, **headers})
+    
+    @staticmethod
+    def queued(admission):
+        gate = admission.gates.get("get_forecast")
+        return gate.queued if gate else 0
+    
+    @staticmethod
+    async def until(condition):
+        import asyncio
+        
+        while not condition():
+            await asyncio.sleep(0)
+    
+    @pytest.mark.asyncio
+    async def test_queue_is_fair_across_clients(self, gated):
+        """Test that waiting calls are served round-robin per client rather than first come."""
+        import asyncio
+        
+        admission, client, started, release = gated
+        calls = []
+        for message_id, client_id in [(1, "a"), (2, "a"), (3, "a"), (4, "b")]:
+            calls.append(asyncio.create_task(self.call(client, message_id, client_id)))
+            await self.until(lambda: len(started) + self.queued(admission) == len(calls))
+        
+        # Other methods and other tools are not held up by the busy tool
+        listed = await client.post("/mcp/", json={"jsonrpc": "2.0", "id": 9, "method": "tools/list"})
+        assert listed.status_code == 200
+        
+        release.set()
+        responses = await asyncio.gather(*calls)
+        assert [response.status_code for response in responses] == [200] * 4
+        assert started == [1, 9, 2, 4, 3]
+    
+    @pytest.mark.asyncio
+    async def test_overload_is_shed_with_retry_hint(self, gated):
+        """Test the per-client quota and the queue bound, and that sheds are counted."""
+        import asyncio
+        
+        admission, client, started, release = gated
+        calls = []
+        for message_id, client_id in [(1, "a"), (2, "a"), (3, "a"), (4, "b")]:
+            calls.append(asyncio.create_task(self.call(client, message_id, client_id)))
+            await self.until(lambda: len(started) + self.queued(admission) == len(calls))
+        
+        over_quota = await self.call(client, 5, "a")
+        queue_full = await self.call(client, 6, "c")
+        release.set()
+        await asyncio.gather(*calls)
+        
+        assert over_quota.status_code == 429
+        assert queue_full.status_code == 503
+        assert int(queue_full.headers["retry-after"]) >= 1
+        error = queue_full.json()
+        assert error["id"] == 6
+        assert error["error"]["data"]["reason"] == "queue_full"
+        body = (await metrics(AsyncMock())).body.decode()
+        assert 'open_meteo_admission_shed_total{tool="get_forecast",reason="client_quota"}' in body
+        assert 'open_meteo_admission_queue_depth{tool="get_forecast"} 0' in body
+    
+    @pytest.mark.asyncio
+    async def test_expired_deadlines_are_shed(self, gated):
+        """Test that calls are dropped when their deadline has passed on arrival or while queued."""
+        import asyncio
+        import time
+        
+        admission, client, started, release = gated
+        expired = await self.call(client, 1, "a", **{"X-Request-Deadline": str(time.time() - 1)})
+        assert expired.status_code == 503
+        assert expired.json()["error"]["data"]["reason"] == "deadline"
+        assert started == []
+        
+        running = asyncio.create_task(self.call(client, 2, "a"))
+        await self.until(lambda: started == [2])
+        timed_out = await self.call(client, 3, "b", **{"X-Request-Timeout": "0.05"})
+        assert timed_out.status_code == 503
+        assert timed_out.json()["error"]["data"]["reason"] == "deadline"
+        assert self.queued(admission) == 0
+        
+        release.set()
+        assert (await running).status_code == 200
+        assert started == [2]
+    
+    @pytest.mark.asyncio
+    async def test_client_id_is_ignored_unless_trusted(self, gated, monkeypatch):
+        """Test that without the opt-in, calls from one address share its quota whatever X-Client-Id they send."""
+        import asyncio
+        import open_meteo_server
+        
+        monkeypatch.setattr(open_meteo_server, "TRUST_CLIENT_ID", False)
+        admission, client, started, release = gated
+        calls = []
+        for message_id, client_id in [(1, "a"), (2, "b"), (3, "c")]:
+            calls.append(asyncio.create_task(self.call(client, message_id, client_id)))
+            await self.until(lambda: len(started) + self.queued(admission) == len(calls))
+        
+        over_quota = await self.call(client, 4, "d")
+        release.set()
+        await asyncio.gather(*calls)
+        
+        assert over_quota.status_code == 429
+        assert over_quota.json()["error"]["data"]["reason"] == "client_quota"
+    
+    def test_installed_on_the_http_app(self):
+        """Test that the streamable-http app, as served by uvicorn, includes the middleware."""
+        from open_meteo_server import AdmissionControl, http_app
+        
+        assert any(middleware.cls is AdmissionControl for middleware in http_app().user_middleware)
+
+
 class TestGetForecastTool:
     """Tests for the get_forecast tool."""
     
@@ -280,8 +1353,9 @@ class TestGetPreviousModelRunsTool:
             assert "precipitation_previous_day2" in hourly_params
             assert "precipitation_previous_day3" in hourly_params
             
-            # Wind speed should not have previous day variants
-            assert "wind_speed_10m_previous_day1" not in hourly_params
+            # Wind speed has earlier runs in the catalog too
+            assert "wind_speed_10m_previous_day3" in hourly_params
+            assert "wind_speed_10m_previous_day4" not in hourly_params
     
     @pytest.mark.asyncio
     async def test_get_previous_model_runs_invalid_days(self):
@@ -0,0 +1,103 @@
+"""Tests for the fast-starting stdio launcher."""
+
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import open_meteo_server
+import open_meteo_stdio
+
+ROOT = Path(__file__).parent
+
+
+def request(message_id, method, params=None):
+    return {"jsonrpc": "2.0", "id": message_id, "method": method, **({"params": params} if params else {})}
+
+
+def run_launcher(messages, manifest_dir):
+    """Feed messages to a fresh launcher process and return its decoded responses."""
+    proc = subprocess.Popen(
+        [sys.executable, str(ROOT / "open_meteo_stdio.py")],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "OPEN_METEO_MANIFEST_DIR": str(manifest_dir)},
+    )
+    responses = []
+    try:
+        # Like a real client, keep stdin open until every response has arrived
+        for message in messages:
+            proc.stdin.write(json.dumps(message).encode() + b"\n")
+            proc.stdin.flush()
+            if "id" in message:
+                responses.append(json.loads(proc.stdout.readline()))
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=10)
+    return responses
+
+
+class TestStdioLauncher:
+    """Tests for answering the handshake from a cached manifest."""
+
+    def test_import_stays_off_the_mcp_sdk(self):
+        """Test that loading the launcher does not pull in the MCP SDK or httpx."""
+        code = "import sys, open_meteo_stdio; print(sorted({'mcp', 'httpx', 'pydantic'} & set(sys.modules)))"
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+        assert out.stdout.strip() == "[]"
+
+    @pytest.mark.asyncio
+    async def test_answers_from_manifest(self, monkeypatch):
+        """Test initialize negotiation and list requests, and hand-off for everything else."""
+        manifest = await open_meteo_stdio.build_manifest(open_meteo_server)
+        stdout = io.TextIOWrapper(io.BytesIO())
+        monkeypatch.setattr(sys, "stdout", stdout)
+
+        assert open_meteo_stdio.answer(request(1, "initialize", {"protocolVersion": "2024-11-05"}), manifest)
+        assert open_meteo_stdio.answer(request(2, "initialize", {"protocolVersion": "1999-01-01"}), manifest)
+        assert open_meteo_stdio.answer({"jsonrpc": "2.0", "method": "notifications/initialized"}, manifest)
+        assert open_meteo_stdio.answer(request(3, "tools/list"), manifest)
+        assert not open_meteo_stdio.answer(request(4, "tools/call", {"name": "get_forecast"}), manifest)
+
+        responses = [json.loads(line) for line in stdout.buffer.getvalue().splitlines()]
+        assert responses[0]["result"]["protocolVersion"] == "2024-11-05"
+        assert responses[0]["result"]["serverInfo"]["name"] == "open-meteo"
+        assert responses[1]["result"]["protocolVersion"] == manifest["latest_protocol_version"]
+        tools = {tool["name"] for tool in responses[2]["result"]["tools"]}
+        assert tools == {tool.name for tool in await open_meteo_server.mcp.list_tools()}
+
+    def test_cold_and_warm_sessions(self, tmp_path):
+        """Test that the first run writes the manifest and later runs hand off mid-session."""
+        messages = [
+            request(1, "initialize", {"protocolVersion": "2025-03-26", "capabilities": {},
+                                      "clientInfo": {"name": "test", "version": "0"}}),
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            request(2, "tools/list"),
+            request(3, "prompts/get", {"name": "current_weather", "arguments": {"location": "Oslo"}}),
+        ]
+
+        cold = run_launcher(messages, tmp_path)
+        assert len(list(tmp_path.glob("manifest-*.json"))) == 1
+        warm = run_launcher(messages, tmp_path)
+
+        for responses in (cold, warm):
+            assert [response["id"] for response in responses] == [1, 2, 3]
+            assert "Oslo" in responses[2]["result"]["messages"][0]["content"]["text"]
+        assert warm[1]["result"] == cold[1]["result"]
+
+    def test_manifest_is_keyed_by_sdk_versions(self, monkeypatch):
+        """Test that upgrading the MCP SDK or pydantic points at a different manifest."""
+        versions = {"mcp": "1.9.0", "fastmcp": "2.5.2", "pydantic": "2.11.4"}
+        assert open_meteo_stdio.package_version("open-meteo-no-such-package") == ""
+        monkeypatch.setattr(open_meteo_stdio, "package_version", versions.get)
+        before = open_meteo_stdio.manifest_path()
+
+        versions["pydantic"] = "2.12.0"
+
+        assert open_meteo_stdio.manifest_path() != before